@@ -6,16 +6,33 @@
 
 """
 
-from importlib.metadata import PackageNotFoundError, version
+from typing import TYPE_CHECKING, Any
 
-from .highlevel import SimVisaLibrary
+if TYPE_CHECKING:
+    from .highlevel import SimVisaLibrary
 
-__version__ = "unknown"
-try:
-    __version__ = version(__name__)
-except PackageNotFoundError:
-    # package is not installed
-    pass
+    WRAPPER_CLASS = SimVisaLibrary
+    __version__: str
 
 
-WRAPPER_CLASS = SimVisaLibrary
+def __getattr__(name: str) -> Any:
+    """Import the backend and look up the version only when first accessed."""
+    if name in ("SimVisaLibrary", "WRAPPER_CLASS"):
+        from .highlevel import SimVisaLibrary
+
+        globals().update(SimVisaLibrary=SimVisaLibrary, WRAPPER_CLASS=SimVisaLibrary)
+        return SimVisaLibrary
+
+    if name == "__version__":
+        from importlib.metadata import PackageNotFoundError, version
+
+        __version__ = "unknown"
+        try:
+            __version__ = version(__name__)
+        except PackageNotFoundError:
+            # package is not installed
+            pass
+        globals()["__version__"] = __version__
+        return __version__
+
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""Compiled definitions stored in a single binary file.
+
+An artifact holds the devices of a definition file, fully built and validated,
+such that a library using it does not need to parse any definition file.
+
+:copyright: 2014-2024 by PyVISA-sim Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+
+"""
+
+import os
+import pathlib
+import pickle
+import sys
+from typing import Any, Dict, Union
+
+from .cache import Definitions
+
+#: Bytes starting every artifact.
+MAGIC = b"PYVISA-SIM LAB\n"
+
+#: Version of the artifact format. Bump when the pickled objects change in an
+#: incompatible way.
+ARTIFACT_FORMAT = 1
+
+#: Extension used by default for artifacts.
+ARTIFACT_SUFFIX = ".simlab"
+
+
+def is_artifact(filename: Union[str, pathlib.Path]) -> bool:
+    """Check whether a file is an artifact rather than a definition file."""
+    try:
+        with open(filename, "rb") as fp:
+            return fp.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def write_artifact(
+    filename: Union[str, pathlib.Path],
+    source: Union[str, pathlib.Path],
+    definitions: Definitions,
+) -> None:
+    """Write the definitions compiled from source to an artifact.
+
+    Parameters
+    ----------
+    filename : Union[str, pathlib.Path]
+        Path of the artifact to write.
+    source : Union[str, pathlib.Path]
+        Definition file from which the definitions were compiled.
+    definitions : Definitions
+        Resource names and the factories of their device.
+
+    Raises
+    ------
+    ValueError
+        Raised if a device cannot be stored, for example because the format of a
+        setter query cannot be pickled. The artifact is left untouched.
+
+    """
+    try:
+        payload = pickle.dumps(definitions, pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        raise ValueError(
+            "Cannot store %s in an artifact: %s" % (_find_unpicklable(definitions), e)
+        ) from e
+    content = MAGIC + pickle.dumps(_header(source), pickle.HIGHEST_PROTOCOL) + payload
+
+    # The artifact is replaced at once so that it is never found incomplete.
+    temp = "%s.%d.tmp" % (filename, os.getpid())
+    try:
+        with open(temp, "wb") as fp:
+            fp.write(content)
+        os.replace(temp, filename)
+    except BaseException:
+        if os.path.exists(temp):
+            os.unlink(temp)
+        raise
+
+
+def read_artifact(filename: Union[str, pathlib.Path]) -> Definitions:
+    """Read the definitions stored in an artifact.
+
+    Raises
+    ------
+    ValueError
+        Raised if the file is not an artifact or if it was compiled by another
+        version of pyvisa-sim or of Python.
+
+    """
+    with open(filename, "rb") as fp:
+        if fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a pyvisa-sim artifact." % filename)
+
+        header = pickle.load(fp)
+        expected = _header(header.get("source", ""))
+        for key in ("format", "version", "python"):
+            if header.get(key) != expected[key]:
+                raise ValueError(
+                    "%s was compiled for %s %s but %s is used, compile %s again."
+                    % (filename, key, header.get(key), expected[key], header["source"])
+                )
+
+        return pickle.load(fp)
+
+
+# --- Private API
+
+
+def _header(source: Union[str, pathlib.Path]) -> Dict[str, Any]:
+    """Header identifying the environment an artifact can be used in."""
+    from . import __version__
+
+    return {
+        "format": ARTIFACT_FORMAT,
+        "version": __version__,
+        "python": sys.implementation.cache_tag,
+        "source": str(source),
+    }
+
+
+def _find_unpicklable(definitions: Definitions) -> str:
+    """Describe the first resource, and setter if possible, which cannot be pickled."""
+    for resource_name, factory in definitions:
+        try:
+            pickle.dumps(factory, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            pass
+        else:
+            continue
+
+        build = getattr(factory, "build", None)
+        if build is not None:
+            device = build()
+            for component in (device, *device._channels.values()):
+                for query, setter in component._setters.items():
+                    try:
+                        pickle.dumps(setter, pickle.HIGHEST_PROTOCOL)
+                    except Exception:
+                        return "setter %r of property %s of resource %s" % (
+                            query,
+                            setter[0],
+                            resource_name,
+                        )
+        return "resource %s" % resource_name
+
+    return "definitions"
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""Caches of the definitions parsed from definition files.
+
+Parsed definitions are kept in a process wide registry, checked against the
+modification time of the files they originate from, and stored on disk, checked
+against the content of those files. The devices built from the definitions are
+stored with them once the process exits (or flush is called), so that they do not
+have to be built again.
+
+Entries on disk start with a JSON header holding the hash of the sources, which
+is checked before the pickled definitions are loaded, such that outdated entries
+are never unpickled. Unpickling can execute arbitrary code: the cache directory
+is trusted and must only be writable by the user running pyvisa-sim.
+
+:copyright: 2014-2024 by PyVISA-sim Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+
+"""
+
+import atexit
+import hashlib
+import importlib.resources
+import json
+import os
+import pathlib
+import pickle
+import sys
+import tempfile
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from .common import logger
+
+if TYPE_CHECKING:
+    from .devices import Device
+
+#: Environment variable overriding the cache directory. An empty value disables
+#: the cache.
+CACHE_DIR_ENV = "PYVISA_SIM_CACHE_DIR"
+
+#: Version of the cache entries format. Bump when the pickled objects change in an
+#: incompatible way.
+CACHE_FORMAT = 4
+
+#: Definition file identified by its path (or resource name) and bundled flag.
+Source = Tuple[Union[str, pathlib.Path], bool]
+
+#: Resource names and the factory building the device bound to each of them.
+Definitions = List[Tuple[str, Callable[[], "Device"]]]
+
+
+def get_cache_dir() -> Optional[pathlib.Path]:
+    """Directory in which compiled definitions are stored, None if disabled."""
+    if CACHE_DIR_ENV in os.environ:
+        value = os.environ[CACHE_DIR_ENV]
+        return pathlib.Path(value) if value else None
+
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return pathlib.Path(base, "pyvisa-sim", "Cache")
+    if sys.platform == "darwin":
+        return pathlib.Path(os.path.expanduser("~/Library/Caches/pyvisa-sim"))
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return pathlib.Path(base, "pyvisa-sim")
+
+
+def load_definitions(
+    filename: Union[str, pathlib.Path], bundled: bool
+) -> Optional[Definitions]:
+    """Load the definitions parsed from a file if they are cached.
+
+    The definitions are looked up in the process registry, then on disk. They are
+    only used if neither the file nor any of the files it loaded changed since
+    they were parsed.
+
+    """
+    key = _registry_key(filename, bundled)
+    with _lock:
+        entry = _registry.get(key)
+    if entry is not None:
+        stamps, _, definitions = entry
+        if all(_stamp(*source) == stamp for source, stamp in stamps.items()):
+            return definitions
+        logger.debug("Registered definitions of %s are outdated" % filename)
+
+    loaded = _load_entry(filename, bundled)
+    if loaded is None:
+        return None
+
+    digests, definitions = loaded
+    _register(key, digests, definitions)
+    return definitions
+
+
+def store_definitions(
+    filename: Union[str, pathlib.Path],
+    bundled: bool,
+    sources: Iterable[Source],
+    definitions: Definitions,
+) -> None:
+    """Store the definitions parsed from a file and the files it loaded.
+
+    Failing to write the cache on disk is not an error.
+
+    """
+    files = [(s if b else os.path.abspath(s), b) for s, b in sources]
+    digests: List[Digest] = [(s, b, None) for s, b in files]
+    if get_cache_dir() is not None:
+        try:
+            digests = [(s, b, _digest(s, b)) for s, b in files]
+        except OSError as e:
+            logger.debug("Failed to hash the sources of %s: %r" % (filename, e))
+
+    key = _registry_key(filename, bundled)
+    _register(key, digests, definitions)
+    _store_entry(key, digests, definitions)
+
+
+def register_definitions(
+    filename: Union[str, pathlib.Path], bundled: bool, definitions: Definitions
+) -> None:
+    """Share definitions read from a file in the process without storing them.
+
+    The file is assumed to reference no other file.
+
+    """
+    source = (os.path.abspath(filename) if not bundled else filename, bundled)
+    _register(_registry_key(filename, bundled), [(*source, None)], definitions)
+
+
+def update_definitions(filename: Union[str, pathlib.Path], bundled: bool) -> None:
+    """Mark the stored definitions of a file as updated.
+
+    This is called once a device has been built from the definitions, the entry
+    being written again, including the built device, when flush is called.
+
+    """
+    with _lock:
+        _updated.add(_registry_key(filename, bundled))
+
+
+def flush() -> None:
+    """Write the definitions updated since they were stored to the disk cache.
+
+    This is called when the process exits.
+
+    """
+    with _lock:
+        keys = list(_updated)
+        _updated.clear()
+        entries = [(key, _registry.get(key)) for key in keys]
+
+    for key, entry in entries:
+        if entry is None:
+            continue
+        _, digests, definitions = entry
+        _store_entry(key, digests, definitions)
+
+
+def clear_registry() -> None:
+    """Forget the definitions registered in this process."""
+    with _lock:
+        _registry.clear()
+        _updated.clear()
+
+
+# --- Private API
+
+#: Content hash of a source when it was parsed, None if unknown.
+#: (path, bundled, digest)
+Digest = Tuple[Union[str, pathlib.Path], bool, Optional[str]]
+
+#: Definitions parsed in this process, the modification stamp of their sources and
+#: the hash of their content when they were parsed.
+#: (path, bundled): ({source: stamp}, [digest], definitions)
+_registry: Dict[
+    Source,
+    Tuple[Dict[Source, Optional[Tuple[int, int]]], List[Digest], Definitions],
+]
+_registry = {}
+
+#: Registered definitions which changed since they were written to disk.
+_updated: Set[Source] = set()
+
+#: Lock protecting the registry.
+_lock = threading.Lock()
+
+atexit.register(flush)
+
+
+def _registry_key(filename: Union[str, pathlib.Path], bundled: bool) -> Source:
+    """Canonical identifier of a definition file."""
+    if bundled:
+        return str(filename), bundled
+    return os.path.realpath(filename), bundled
+
+
+def _stamp(
+    filename: Union[str, pathlib.Path], bundled: bool
+) -> Optional[Tuple[int, int]]:
+    """Modification time and size of a file, None if it cannot be accessed."""
+    if bundled:
+        resource = importlib.resources.files("pyvisa_sim").joinpath(str(filename))
+        if not isinstance(resource, pathlib.Path):
+            return None
+        filename = resource
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _register(key: Source, digests: List[Digest], definitions: Definitions) -> None:
+    """Add definitions to the process registry."""
+    stamps = {(s, b): _stamp(s, b) for s, b, _ in digests}
+    with _lock:
+        _registry[key] = (stamps, digests, definitions)
+        _updated.discard(key)
+
+
+def _load_entry(
+    filename: Union[str, pathlib.Path], bundled: bool
+) -> Optional[Tuple[List[Digest], Definitions]]:
+    """Load the definitions parsed from a file from the disk cache."""
+    directory = get_cache_dir()
+    if directory is None:
+        return None
+
+    try:
+        path = directory / _entry_name(filename, bundled)
+        with open(path, "rb") as fp:
+            sources: List[Digest] = [
+                (str(source), bool(source_bundled), str(digest))
+                for source, source_bundled, digest in json.loads(fp.readline())
+            ]
+            for source, source_bundled, digest in sources:
+                if _digest(source, source_bundled) != digest:
+                    logger.debug("Cached definitions of %s are outdated" % filename)
+                    return None
+            definitions = pickle.load(fp)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug("Failed to load cached definitions of %s: %r" % (filename, e))
+        return None
+
+    return sources, definitions
+
+
+def _store_entry(key: Source, digests: List[Digest], definitions: Definitions) -> None:
+    """Store the definitions parsed from a file in the disk cache.
+
+    The entry replaces any previous entry of the same file. Nothing is stored if
+    the content of a source is unknown.
+
+    """
+    directory = get_cache_dir()
+    if directory is None or any(digest is None for _, _, digest in digests):
+        return
+
+    filename, bundled = key
+    try:
+        header = json.dumps([[str(s), b, d] for s, b, d in digests])
+        content = (
+            header.encode("utf-8")
+            + b"\n"
+            + pickle.dumps(definitions, pickle.HIGHEST_PROTOCOL)
+        )
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(content)
+            os.replace(temp, directory / _entry_name(filename, bundled))
+        except BaseException:
+            os.unlink(temp)
+            raise
+    except Exception as e:
+        logger.debug("Failed to cache definitions of %s: %r" % (filename, e))
+
+
+def _read_source(filename: Union[str, pathlib.Path], bundled: bool) -> bytes:
+    """Read the content of a definition file."""
+    if bundled:
+        return (
+            importlib.resources.files("pyvisa_sim").joinpath(str(filename)).read_bytes()
+        )
+    with open(filename, "rb") as fp:
+        return fp.read()
+
+
+def _digest(filename: Union[str, pathlib.Path], bundled: bool) -> str:
+    """Hash of the content of a definition file."""
+    return hashlib.sha256(_read_source(filename, bundled)).hexdigest()
+
+
+def _entry_name(filename: Union[str, pathlib.Path], bundled: bool) -> str:
+    """Name of the cache entry of a definition file.
+
+    The name does not depend on the content of the file, such that storing new
+    definitions replaces the outdated ones.
+
+    """
+    from . import __version__
+
+    if not bundled:
+        filename = os.path.realpath(filename)
+    key: List[str] = [
+        str(CACHE_FORMAT),
+        __version__,
+        sys.implementation.cache_tag or "",
+        repr((str(filename), bundled)),
+    ]
+    return hashlib.sha256("\0".join(key).encode("utf-8")).hexdigest() + ".pickle"
@@ -6,18 +6,52 @@
 
 """
 
-from collections import defaultdict
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, TypeVar
+import copy
+import random
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 import stringparser
 
 from .common import logger
-from .component import Component, OptionalBytes, OptionalStr, Property, T, to_bytes
+from .component import (
+    Component,
+    Handler,
+    OptionalBytes,
+    OptionalStr,
+    Property,
+    T,
+    dialogue_handler,
+    getter_handler,
+    to_bytes,
+)
 
 if TYPE_CHECKING:
     from .devices import Device
 
 
+class ChannelValues(Dict[Any, T]):
+    """Values of a property by channel, defaulting to the initial value."""
+
+    #: Value of the channels which were never set.
+    default: T
+
+    def __init__(self, default: T) -> None:
+        super().__init__()
+        self.default = default
+
+    def __missing__(self, key: Any) -> T:
+        return self.default
+
+
 class ChannelProperty(Property[T]):
     """A channel property storing the value for all channels."""
 
@@ -28,9 +62,8 @@ class ChannelProperty(Property[T]):
         super(ChannelProperty, self).__init__(name, default_value, specs)
 
     def init_value(self, string_value: str) -> None:
-        """Create an empty defaultdict holding the default value."""
-        value = self.validate_value(string_value)
-        self._value = defaultdict(lambda: value)
+        """Create an empty mapping holding the default value."""
+        self._value = ChannelValues(self.validate_value(string_value))
 
     def get_value(self) -> Optional[T]:
         """Get the current value for a channel."""
@@ -54,14 +87,26 @@ V = TypeVar("V")
 
 
 class ChDict(Dict[str, Dict[bytes, V]]):
-    """Default dict like creating specialized command sets for a channel."""
+    """Default dict like creating specialized command sets for a channel.
+
+    Specialized command sets are created on first access and stored.
+
+    """
 
     def __missing__(self, key: str) -> Dict[bytes, V]:
         """Create a channel specialized version of the mapping found in __default__."""
-        return {
+        value = {
             k.decode("utf-8").format(ch_id=key).encode("utf-8"): v
             for k, v in self["__default__"].items()
         }
+        self[key] = value
+        return value
+
+    def reset(self) -> None:
+        """Discard the specialized command sets after __default__ was altered."""
+        default = self["__default__"]
+        self.clear()
+        self["__default__"] = default
 
 
 class Channels(Component):
@@ -79,6 +124,32 @@ class Channels(Component):
         self._ids = ids
         self._getters = ChDict(__default__={})
         self._dialogues = ChDict(__default__={})
+        self._index = None
+
+    def clone(  # type: ignore[override]
+        self, device: "Device", ids: Optional[List[str]] = None
+    ) -> "Channels":
+        """Create channels attached to device sharing the command tables of these.
+
+        Parameters
+        ----------
+        device : Device
+            Device owning the new channels.
+        ids : Optional[List[str]]
+            Ids of the activated channels, defaults to the ids of these channels.
+
+        """
+        clone = super().clone()
+        clone._device = device
+        clone._selected = None
+        for prop in clone._properties.values():
+            assert isinstance(prop, ChannelProperty)
+            prop._channel = clone
+            prop._value = copy.copy(prop._value)
+        if ids is not None and ids != self._ids:
+            clone._ids = ids
+            clone._index = None
+        return clone
 
     def add_dialogue(self, query: str, response: str) -> None:
         """Add dialogue to channel.
@@ -91,7 +162,9 @@ class Channels(Component):
             Response sent in response to a query.
 
         """
-        self._dialogues["__default__"][to_bytes(query)] = to_bytes(response)
+        self._own_tables()
+        self._dialogues["__default__"][to_bytes(query)] = dialogue_handler(response)
+        self._invalidate()
 
     def add_property(
         self,
@@ -118,18 +191,35 @@ class Channels(Component):
             Specification for the property as a dict.
 
         """
+        self._own_tables()
+        if name in self._properties:
+            self._discard_property(name)
         self._properties[name] = ChannelProperty(self, name, default_value, specs)
+        self._invalidate()
 
         if getter_pair:
             query, response = getter_pair
-            self._getters["__default__"][to_bytes(query)] = name, response
+            self._getters["__default__"][to_bytes(query)] = getter_handler(
+                name, response
+            )
 
         if setter_triplet:
             query, response_, error = setter_triplet
             self._setters.append(
-                (name, stringparser.Parser(query), to_bytes(response_), to_bytes(error))
+                query,
+                (
+                    name,
+                    stringparser.Parser(query),
+                    to_bytes(response_),
+                    to_bytes(error),
+                ),
             )
 
+    @property
+    def random_generator(self) -> Optional[random.Random]:
+        """Generator used for random responses, shared with the device."""
+        return self._device.random_generator
+
     def match(self, query: bytes) -> Optional[OptionalBytes]:
         """Try to find a match for a query in the channel commands."""
         if not self.can_select:
@@ -139,28 +229,40 @@ class Channels(Component):
             else:
                 return None
 
-            response = self._match_dialog(query, self._dialogues["__default__"])
-            if response is not None:
-                return response
-
-            response = self._match_getters(query, self._getters["__default__"])
+            response = self._match_dispatch(query)
             if response is not None:
                 return response
 
         else:
-            for ch_id in self._ids:
-                self._selected = ch_id
-                response = self._match_dialog(query, self._dialogues[ch_id])
-                if response is not None:
-                    return response
+            if self._index is None:
+                self.compile()
+                assert self._index is not None
 
-                response = self._match_getters(query, self._getters[ch_id])
+            entry = self._index.get(query)
+            if entry is not None:
+                self._selected, handler = entry
+                return handler(self)
 
-                if response is not None:
-                    return response
+            # Setters not specifying a channel apply to the last inspected one.
+            if self._ids:
+                self._selected = self._ids[-1]
 
         return self._match_setters(query)
 
+    def compile(self) -> None:
+        """Compile the dispatch table and the index of the channel specific queries."""
+        super().compile()
+
+        # When the same query exists for several channels, the first channel wins.
+        index: Dict[bytes, Tuple[str, Handler]] = {}
+        for ch_id in self._ids:
+            for query, handler in self._dialogues[ch_id].items():
+                index.setdefault(query, (ch_id, handler))
+            for query, handler in self._getters[ch_id].items():
+                index.setdefault(query, (ch_id, handler))
+
+        self._index = index
+
     # --- Private API
 
     #: Currently active channel, this can either reflect the currently
@@ -176,20 +278,51 @@ class Channels(Component):
     _ids: List[str]
 
     #: Dialogues organized by channel IDs
-    _dialogues: Dict[str, Dict[bytes, bytes]]  # type: ignore
+    _dialogues: Dict[str, Dict[bytes, Handler]]  # type: ignore
 
     #: Getters organized by channel ID
-    _getters: Dict[str, Dict[bytes, Tuple[str, str]]]  # type: ignore
+    _getters: Dict[str, Dict[bytes, Handler]]  # type: ignore
+
+    #: Channel specific queries and the channel they select, None if it needs to
+    #: be compiled.
+    #: query: (channel id, handler)
+    _index: Optional[Dict[bytes, Tuple[str, Handler]]]
+
+    def _own_tables(self) -> None:
+        """Copy the command tables shared with a clone before modifying them."""
+        if self._tables_shared:
+            self._dialogues = ChDict(__default__=dict(self._dialogues["__default__"]))
+            self._getters = ChDict(__default__=dict(self._getters["__default__"]))
+            self._setters = self._setters.copy()
+            self._tables_shared = False
+
+    def _discard_property(self, name: str) -> None:
+        """Remove the getter and setters of a property which is redefined."""
+        getters = self._getters["__default__"]
+        self._getters = ChDict(
+            __default__={
+                q: h for q, h in getters.items() if getattr(h, "name", None) != name
+            }
+        )
+        self._setters = self._setters.without(name)
+
+    def _invalidate(self) -> None:
+        """Discard compiled tables after a definition was added."""
+        self._dialogues.reset()  # type: ignore
+        self._getters.reset()  # type: ignore
+        self._dispatch = None
+        self._index = None
+
+    def _iter_handlers(self) -> Iterator[Tuple[bytes, Handler]]:
+        """Iterate over the queries of the selected channel and their handler."""
+        yield from self._dialogues["__default__"].items()
+        yield from self._getters["__default__"].items()
 
     def _match_setters(self, query: bytes) -> Optional[OptionalBytes]:
         """Try to find a match"""
         q = query.decode("utf-8")
-        for name, parser, response, error_response in self._setters:
-            try:
-                parsed = parser(q)
-                logger.debug("Found response in setter of %s" % name)
-            except ValueError:
-                continue
+        for (name, _, response, error_response), parsed in self._setters.parse(q):
+            logger.debug("Found response in setter of %s" % name)
 
             try:
                 if isinstance(parsed, dict) and "ch_id" in parsed:
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""Command line interface of pyvisa-sim.
+
+:copyright: 2014-2024 by PyVISA-sim Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+
+"""
+
+import argparse
+import pathlib
+import sys
+from typing import List, Optional, Sequence, Union
+
+from . import artifact, formats, parser
+from .devices import Devices
+
+
+def compile_definitions(
+    source: Union[str, pathlib.Path], output: Union[str, pathlib.Path]
+) -> List[str]:
+    """Build all the devices of a definition file and store them in an artifact.
+
+    Every device is built, so that any error in the definitions is reported now
+    rather than when the resource is first opened.
+
+    Parameters
+    ----------
+    source : Union[str, pathlib.Path]
+        Path of the definition file.
+    output : Union[str, pathlib.Path]
+        Path of the artifact to write.
+
+    Returns
+    -------
+    List[str]
+        Names of the resources stored in the artifact.
+
+    Raises
+    ------
+    ValueError
+        Raised if a resource name or the definition of a device is invalid.
+
+    """
+    definitions = parser.get_definitions(source, False)
+
+    devices = Devices()
+    for resource_name, factory in definitions:
+        try:
+            devices.add_device_factory(resource_name, factory)
+        except Exception as e:
+            raise ValueError("Invalid resource name %s: %s" % (resource_name, e)) from e
+
+    for resource_name in devices.list_resources():
+        try:
+            devices[resource_name]
+        except Exception as e:
+            raise ValueError("In resource %s: %s" % (resource_name, e)) from e
+
+    artifact.write_artifact(output, source, definitions)
+    return list(devices.list_resources())
+
+
+def convert_definitions(
+    source: Union[str, pathlib.Path], output: Union[str, pathlib.Path]
+) -> None:
+    """Convert a definition file to the format matching the extension of output.
+
+    The files referenced by the definition file are not converted, definition
+    files of different formats can reference each other.
+
+    Parameters
+    ----------
+    source : Union[str, pathlib.Path]
+        Path of the definition file.
+    output : Union[str, pathlib.Path]
+        Path of the JSON or TOML file to write.
+
+    Raises
+    ------
+    ValueError
+        Raised if the format of output is not supported.
+
+    """
+    fmt = formats.get_format(output)
+    if fmt == "yaml":
+        raise ValueError(
+            "Cannot convert to %s, supported extensions are %s"
+            % (output, ", ".join(formats.FORMATS))
+        )
+
+    data = parser.parse_file(source)
+    content = formats.dumps(data, fmt)
+    if formats.loads(content, fmt) != data:
+        raise ValueError("%s cannot be represented in %s" % (source, fmt))
+
+    with open(output, "w", encoding="utf-8") as fp:
+        fp.write(content)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the pyvisa-sim command and return its exit status."""
+    arg_parser = argparse.ArgumentParser(
+        prog="pyvisa-sim", description="Tools for PyVISA-sim definition files."
+    )
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = commands.add_parser(
+        "compile",
+        help="Build the devices of a definition file into a binary artifact.",
+        description=(
+            "Build and validate all the devices of a definition file and store "
+            "them in a binary artifact which can be used as the library path of "
+            "the simulated backend (e.g. ResourceManager('lab%s@sim'))."
+            % artifact.ARTIFACT_SUFFIX
+        ),
+    )
+    compile_parser.add_argument("source", help="Definition file to compile.")
+    compile_parser.add_argument(
+        "-o",
+        "--output",
+        help="Path of the artifact (defaults to the source with a %s suffix)."
+        % artifact.ARTIFACT_SUFFIX,
+    )
+
+    convert_parser = commands.add_parser(
+        "convert",
+        help="Convert a YAML definition file to JSON or TOML.",
+        description=(
+            "Convert a definition file to JSON or TOML, which are much faster to "
+            "load. The files it references are left untouched."
+        ),
+    )
+    convert_parser.add_argument("source", help="Definition file to convert.")
+    convert_parser.add_argument(
+        "-o",
+        "--output",
+        help="Path of the converted file, whose extension selects the format "
+        "(defaults to the source with the suffix of the format).",
+    )
+    convert_parser.add_argument(
+        "-f",
+        "--format",
+        choices=sorted(set(formats.FORMATS.values())),
+        default="json",
+        help="Format used if no output is specified (default: json).",
+    )
+
+    args = arg_parser.parse_args(argv)
+
+    try:
+        if args.command == "compile":
+            output = args.output or pathlib.Path(args.source).with_suffix(
+                artifact.ARTIFACT_SUFFIX
+            )
+            names = compile_definitions(args.source, output)
+            print("Compiled %d resources into %s" % (len(names), output))
+        elif args.command == "convert":
+            output = args.output or pathlib.Path(args.source).with_suffix(
+                "." + args.format
+            )
+            convert_definitions(args.source, output)
+            print("Converted %s into %s" % (args.source, output))
+    except Exception as e:
+        print("pyvisa-sim: error: %s" % e, file=sys.stderr)
+        return 1
+
+    return 0
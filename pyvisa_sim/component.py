@@ -6,13 +6,19 @@
 
 """
 
+import copy
 import enum
 import random
 import re
+import string
+from functools import lru_cache
 from typing import (
+    Any,
+    ClassVar,
     Dict,
     Final,
     Generic,
+    Iterator,
     List,
     Literal,
     Optional,
@@ -34,6 +40,10 @@ from .common import logger
 class Responses(enum.Enum):
     NO = object()
 
+    def __reduce_ex__(self, protocol):
+        # Pickle by name since the value is only unique within a process.
+        return getattr, (self.__class__, self.name)
+
 
 NoResponse: Final = Responses.NO
 
@@ -61,25 +71,432 @@ def to_bytes(val):
 
 T = TypeVar("T", int, float, str)
 
+#: Setter definition: (property_name, string parser query, response, error response)
+Setter: TypeAlias = Tuple[str, stringparser.Parser, OptionalBytes, OptionalBytes]
+
+_FORMATTER = string.Formatter()
+
+
+def literal_prefix(format_string: str) -> str:
+    """Return the literal text preceding the first replacement field of a format."""
+    prefix = []
+    for literal, field, _, _ in _FORMATTER.parse(format_string):
+        prefix.append(literal)
+        if field is not None:
+            break
+    return "".join(prefix)
+
+
+#: Number of values from which random responses are drawn using NumPy, if available.
+NUMPY_MIN_COUNT = 1000
+
+
+@lru_cache()
+def _numpy() -> Any:
+    """Import NumPy on first use, returning None if it is not installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+#: Pattern of a valid RANDOM directive within a replacement field.
+_RANDOM_DIRECTIVE = re.compile(r"{RANDOM\((\d*.\d*), (\d*.\d*), (\d*)\).*}")
+
+#: Pattern of the RANDOM call to remove from the template.
+_RANDOM_CALL = re.compile(r"RANDOM\((\d*.\d*), (\d*.\d*), (\d*)\)")
+
+
+class RandomResponse:
+    """Generator of responses containing one or more random values.
+
+    The RANDOM directive of the template is parsed once, generating a response only
+    requires to draw the values and format them. Large numbers of values are drawn
+    in a single call using NumPy when it is installed, producing the same values
+    as the random module.
+
+    Parameters
+    ----------
+    template : str
+        Response containing a directive of the form
+        ``{RANDOM(min, max, num_of_results):<format spec>}``.
+
+    """
+
+    #: Lower bound of the random values.
+    min: float
+
+    #: Upper bound of the random values.
+    max: float
+
+    #: Number of values in a response.
+    count: int
+
+    #: Template used to format each value.
+    format: str
+
+    #: Whether the template contained a valid directive, an invalid directive
+    #: only raises when generating a response.
+    valid: bool
+
+    def __init__(self, template: str) -> None:
+        self.min = self.max = 0.0
+        self.count = 0
+        self.format = template
+        self.valid = False
+
+        match = _RANDOM_DIRECTIVE.search(template)
+        if match is None:
+            return
+
+        min_value, max_value, num_of_results = match.groups()
+        try:
+            self.min, self.max = float(min_value), float(max_value)
+            self.count = int(num_of_results)
+        except ValueError:
+            return
+
+        self.format = _RANDOM_CALL.sub("", template)
+        self.valid = True
+
+    def __call__(self, rng: Optional[random.Random] = None) -> str:
+        """Generate a response.
+
+        Parameters
+        ----------
+        rng : Optional[random.Random], optional
+            Random number generator to use. The global one of the random module is
+            used if None.
+
+        """
+        if not self.valid:
+            raise Exception(
+                "pyvisa-sim: Wrong RANDOM directive, see documentation for correct usage."
+            )
+
+        generator = random if rng is None else rng
+        min_value, max_value, count = self.min, self.max, self.count
+
+        np = _numpy() if count >= NUMPY_MIN_COUNT else None
+        if np is not None:
+            # NumPy continues the Mersenne Twister of the Python generator and
+            # computes uniform values the same way, such that responses do not
+            # depend on whether NumPy is installed.
+            version, internal, gauss = generator.getstate()
+            np_rng = np.random.RandomState()
+            np_rng.set_state(
+                ("MT19937", np.array(internal[:-1], dtype=np.uint32), internal[-1])
+            )
+            samples = np_rng.random_sample(count)
+            values = (min_value + (max_value - min_value) * samples).tolist()
+            _, key, pos, _, _ = np_rng.get_state()
+            generator.setstate((version, (*key.tolist(), pos), gauss))
+        else:
+            uniform = generator.uniform
+            values = [uniform(min_value, max_value) for _ in range(count)]
+
+        return _joined_format(self.format, count).format(*values)
+
+
+@lru_cache()
+def _joined_format(template: str, count: int) -> str:
+    """Template formatting count values at once, separated by commas."""
+    return ", ".join([template] * count)
+
 
 def random_response(response: str) -> str:
     """
     Return a response containing one or more random values.
     """
-    random_directive = re.findall(
-        r"{RANDOM\((\d*.\d*), (\d*.\d*), (\d*)\).*}", response
+    return RandomResponse(response)()
+
+
+class Handler:
+    """Object producing the response to a query matched exactly.
+
+    Handlers do not store any state: the component answering the query is passed
+    on each call.
+
+    """
+
+    #: Kind of definition the handler originates from, used in error messages.
+    kind: str = ""
+
+    def __call__(self, component: "Component") -> OptionalBytes:
+        raise NotImplementedError()
+
+
+class DialogueHandler(Handler):
+    """Handler returning the static response of a dialogue."""
+
+    kind = "dialogue"
+
+    def __init__(self, response: OptionalBytes) -> None:
+        self.response = response
+
+    def __call__(self, component: "Component") -> OptionalBytes:
+        logger.debug("Found response in queries: %s" % repr(self.response))
+        return self.response
+
+
+class GetterHandler(Handler):
+    """Handler formatting the value of a property."""
+
+    kind = "getter"
+
+    def __init__(self, name: str, response: str) -> None:
+        self.name = name
+        self.response = response
+
+    def __call__(self, component: "Component") -> OptionalBytes:
+        logger.debug("Found response in getter of %s" % self.name)
+        value = component._properties[self.name].get_value()
+        return self.response.format(value).encode("utf-8")
+
+
+class RandomHandler(Handler):
+    """Handler generating a response made of random values."""
+
+    def __init__(
+        self, kind: str, generator: RandomResponse, name: Optional[str] = None
+    ) -> None:
+        self.kind = kind
+        self.generator = generator
+        self.name = name
+
+    def __call__(self, component: "Component") -> OptionalBytes:
+        logger.debug("Generating random response for a %s" % self.kind)
+        return self.generator(component.random_generator).encode("utf-8")
+
+
+def dialogue_handler(response: OptionalStr) -> Handler:
+    """Create the handler answering a dialogue query."""
+    response_bytes = to_bytes(response)
+    if response_bytes is not NoResponse and b"RANDOM" in response_bytes:
+        return RandomHandler("dialogue", RandomResponse(response_bytes.decode("utf-8")))
+    return DialogueHandler(response_bytes)
+
+
+def getter_handler(name: str, response: str) -> Handler:
+    """Create the handler answering the getter query of a property."""
+    if "RANDOM" in response:
+        return RandomHandler("getter", RandomResponse(response), name)
+    return GetterHandler(name, response)
+
+
+class SetterTable:
+    """Setters of a component indexed by the literal prefix of their query.
+
+    Only the setters whose prefix matches the beginning of a query are candidates
+    to parse it, and they are tried in the order in which they were added.
+
+    """
+
+    #: Name under which the table can be selected in definition files.
+    engine: ClassVar[str] = "parser"
+
+    def __init__(self) -> None:
+        self._queries = []
+        self._setters = []
+        self._index = {}
+        self._lengths = []
+
+    def __len__(self) -> int:
+        return len(self._setters)
+
+    def __iter__(self) -> Iterator[Setter]:
+        return iter(self._setters)
+
+    def items(self) -> Iterator[Tuple[str, Setter]]:
+        """Iterate over the setters and the query format they were added with."""
+        return zip(self._queries, self._setters)
+
+    def copy(self) -> "SetterTable":
+        """Create a table holding the same setters."""
+        table = type(self)()
+        for query, setter in self.items():
+            table.append(query, setter)
+        return table
+
+    def without(self, name: str) -> "SetterTable":
+        """Create a table holding the setters of all properties but name."""
+        table = type(self)()
+        for query, setter in self.items():
+            if setter[0] != name:
+                table.append(query, setter)
+        return table
+
+    def append(self, query: str, setter: Setter) -> None:
+        """Add a setter whose query format is query."""
+        prefix = literal_prefix(query)
+        if len(prefix) not in self._index:
+            self._index[len(prefix)] = {}
+            self._lengths = sorted(self._index)
+        self._index[len(prefix)].setdefault(prefix, []).append(len(self._setters))
+        self._queries.append(query)
+        self._setters.append(setter)
+
+    def candidates(self, query: str) -> Iterator[Setter]:
+        """Iterate over the setters whose literal prefix matches the query."""
+        setters = self._setters
+        for i in self._candidate_positions(query):
+            yield setters[i]
+
+    def parse(self, query: str) -> Iterator[Tuple[Setter, Any]]:
+        """Iterate over the setters able to parse the query and the parsed value."""
+        return self._parse_from(query, 0)
+
+    def compile(self) -> None:
+        """Build the structures used to match queries ahead of the first query."""
+        pass
+
+    # --- Private API
+
+    #: Query formats of the setters.
+    _queries: List[str]
+
+    #: Setters in the order in which they were added.
+    _setters: List[Setter]
+
+    #: Position of the setters by literal prefix, grouped by prefix length.
+    #: length: {prefix: [position]}
+    _index: Dict[int, Dict[str, List[int]]]
+
+    #: Known prefix lengths in increasing order.
+    _lengths: List[int]
+
+    def _candidate_positions(self, query: str) -> List[int]:
+        """Sorted positions of the setters whose literal prefix matches the query."""
+        positions: List[int] = []
+        for length in self._lengths:
+            if length > len(query):
+                break
+            positions.extend(self._index[length].get(query[:length], ()))
+
+        return sorted(positions)
+
+    def _parse_from(self, query: str, start: int) -> Iterator[Tuple[Setter, Any]]:
+        """Parse the query with the candidates found at or after start."""
+        setters = self._setters
+        for i in self._candidate_positions(query):
+            if i < start:
+                continue
+            setter = setters[i]
+            try:
+                value = setter[1](query)
+            except ValueError:
+                continue
+            yield setter, value
+
+
+class RegexSetterTable(SetterTable):
+    """Setters matched through a single regular expression.
+
+    The patterns of all setters are combined into one alternation, so that a
+    single match identifies the first setter accepting a query and extracts its
+    values. The following candidates are only parsed one by one if the value
+    parsed by the first one is rejected.
+
+    """
+
+    engine = "regex"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._regex = None
+        self._alternatives = {}
+
+    def append(self, query: str, setter: Setter) -> None:
+        """Add a setter whose query format is query."""
+        super().append(query, setter)
+        self._regex = None
+
+    def compile(self) -> None:
+        """Combine the patterns of all setters into a single regular expression."""
+        if self._setters and self._regex is None:
+            self._compile()
+
+    def parse(self, query: str) -> Iterator[Tuple[Setter, Any]]:
+        """Iterate over the setters able to parse the query and the parsed value."""
+        if not self._setters:
+            return
+
+        if self._regex is None:
+            self._compile()
+            assert self._regex is not None
+
+        match = self._regex.search(query)
+        if match is None:
+            return
+
+        assert match.lastindex is not None
+        position, first_group, fields = self._alternatives[match.lastindex]
+        setter = self._setters[position]
+        if fields is None:
+            value = setter[1](query)
+        else:
+            values = [
+                fun(match.group(first_group + i)) for i, (_, fun) in enumerate(fields)
+            ]
+            value = _structure_values(fields, values)
+
+        yield setter, value
+        yield from self._parse_from(query, position + 1)
+
+    # --- Private API
+
+    #: Combined regular expression, None if it needs to be compiled.
+    _regex: Optional["re.Pattern[str]"]
+
+    #: Alternatives by index of the group enclosing them.
+    #: group: (setter position, first field group, fields or None if the value
+    #: has to be extracted by the parser)
+    _alternatives: Dict[int, Tuple[int, int, Optional[List[Tuple[str, Any]]]]]
+
+    def _compile(self) -> None:
+        """Combine the patterns of all setters into a single regular expression."""
+        parts = []
+        alternatives = {}
+        group = 1
+        for position, (_, parser, _, _) in enumerate(self._setters):
+            regex = parser._regex
+            # Strip the anchors added by stringparser, they are shared.
+            parts.append("(" + regex.pattern[1:-1] + ")")
+            fields = parser._fields if _has_flat_fields(parser._fields) else None
+            alternatives[group] = (position, group + 1, fields)
+            group += 1 + regex.groups
+
+        self._regex = re.compile("^(?:" + "|".join(parts) + ")$")
+        self._alternatives = alternatives
+
+
+def _has_flat_fields(fields: List[Tuple[str, Any]]) -> bool:
+    """Check that the fields of a parser produce a flat list or dict."""
+    names = [name for name, _ in fields]
+    return (
+        bool(names)
+        and len(set(names)) == len(names)
+        and not any("." in name or "[" in name for name in names)
     )
-    if len(random_directive) == 0:
-        raise Exception(
-            "pyvisa-sim: Wrong RANDOM directive, see documentation for correct usage."
-        )
-    response = re.sub(r"RANDOM\((\d*.\d*), (\d*.\d*), (\d*)\)", "", response)
-    min_value, max_value, num_of_results = random_directive[0]
-    output_str = []
-    for i in range(int(num_of_results)):
-        value = random.uniform(float(min_value), float(max_value))
-        output_str.append(response.format(value))
-    return ", ".join(output_str)
+
+
+def _structure_values(fields: List[Tuple[str, Any]], values: List[Any]) -> Any:
+    """Organize parsed values the way stringparser does for flat fields."""
+    names = [name for name, _ in fields]
+    if all(name.isdigit() and str(int(name)) == name for name in names) and sorted(
+        int(name) for name in names
+    ) == list(range(len(names))):
+        ordered = [value for _, value in sorted(zip(map(int, names), values))]
+        return ordered[0] if len(ordered) == 1 else ordered
+
+    return dict(zip(names, values))
+
+
+#: Setter tables by engine name.
+SETTER_ENGINES: Dict[str, Type[SetterTable]] = {
+    table.engine: table for table in (SetterTable, RegexSetterTable)
+}
 
 
 class Specs(Generic[T]):
@@ -205,6 +622,9 @@ class Property(Generic[T]):
     _value: Optional[T]
 
 
+C = TypeVar("C", bound="Component")
+
+
 class Component:
     """A component of a device."""
 
@@ -212,7 +632,24 @@ class Component:
         self._dialogues = {}
         self._properties = {}
         self._getters = {}
-        self._setters = []
+        self._setters = SetterTable()
+        self._dispatch = None
+        self._rng = None
+        self._tables_shared = False
+
+    def clone(self: C) -> C:
+        """Create a component sharing the command tables of this one.
+
+        The clone holds its own copy of the properties and of the random generator
+        while the command tables are only copied when a definition is added to
+        either component.
+
+        """
+        clone = copy.copy(self)
+        clone._properties = {k: copy.copy(v) for k, v in self._properties.items()}
+        clone._rng = copy.copy(self._rng)
+        self._tables_shared = clone._tables_shared = True
+        return clone
 
     def add_dialogue(self, query: str, response: str) -> None:
         """Add dialogue to device.
@@ -225,7 +662,9 @@ class Component:
             Response to the dialog query.
 
         """
-        self._dialogues[to_bytes(query)] = to_bytes(response)
+        self._own_tables()
+        self._dialogues[to_bytes(query)] = dialogue_handler(response)
+        self._dispatch = None
 
     def add_property(
         self,
@@ -252,85 +691,159 @@ class Component:
             Specification for the property as a dict.
 
         """
+        self._own_tables()
+        if name in self._properties:
+            self._discard_property(name)
         self._properties[name] = Property(name, default_value, specs)
+        self._dispatch = None
 
         if getter_pair:
             query, response = getter_pair
-            self._getters[to_bytes(query)] = name, response
+            self._getters[to_bytes(query)] = getter_handler(name, response)
 
         if setter_triplet:
             query, response_, error = setter_triplet
             self._setters.append(
-                (name, stringparser.Parser(query), to_bytes(response_), to_bytes(error))
+                query,
+                (
+                    name,
+                    stringparser.Parser(query),
+                    to_bytes(response_),
+                    to_bytes(error),
+                ),
             )
 
     def match(self, query: bytes) -> Optional[OptionalBytes]:
         """Try to find a match for a query in the instrument commands."""
         raise NotImplementedError()
 
-    # --- Private API
+    @property
+    def random_generator(self) -> Optional[random.Random]:
+        """Generator used for random responses, None to use the global one."""
+        return self._rng
 
-    #: Stores the queries accepted by the device.
-    #: query: response
-    _dialogues: Dict[bytes, bytes]
+    def set_random_seed(self, seed: Optional[int]) -> None:
+        """Use a dedicated random generator seeded with seed for random responses.
 
-    #: Maps property names to value, type, validator
-    _properties: Dict[str, Property]
+        If seed is None, the global generator of the random module is used.
 
-    #: Stores the getter queries accepted by the device.
-    #: query: (property_name, response)
-    _getters: Dict[bytes, Tuple[str, str]]
+        """
+        self._rng = None if seed is None else random.Random(seed)
 
-    #: Stores the setters queries accepted by the device.
-    #: (property_name, string parser query, response, error response)
-    _setters: List[Tuple[str, stringparser.Parser, OptionalBytes, OptionalBytes]]
+    @property
+    def setter_engine(self) -> str:
+        """Name of the engine used to match setters."""
+        return self._setters.engine
 
-    def _match_dialog(
-        self, query: bytes, dialogues: Optional[Dict[bytes, bytes]] = None
-    ) -> Optional[bytes]:
-        """Tries to match in dialogues
+    def set_setter_engine(self, engine: str) -> None:
+        """Select the engine used to match setters.
 
         Parameters
         ----------
-        query : bytes
-            Query that we try to match to.
-        dialogues : Optional[Dict[bytes, bytes]], optional
-            Alternative dialogs to use when matching.
+        engine : str
+            Name of the engine: 'parser' to try the parser of each candidate in
+            turn, 'regex' to combine all setters into a single regular expression.
 
-        Returns
-        -------
-        Optional[bytes]
-            Response if a dialog matched.
+        """
+        try:
+            table = SETTER_ENGINES[engine]()
+        except KeyError:
+            raise ValueError(
+                "Invalid setter engine '%s', valid engines are: %s"
+                % (engine, ", ".join(repr(e) for e in SETTER_ENGINES))
+            )
+
+        for query, setter in self._setters.items():
+            table.append(query, setter)
+        self._setters = table
+
+    def compile(self) -> None:
+        """Merge all the queries matched exactly in a single dispatch table.
+
+        If the same query is used by two different definitions, a warning is
+        logged and the first one is used (dialogues take precedence over getters,
+        which take precedence over status registers and error queues).
 
         """
-        if dialogues is None:
-            dialogues = self._dialogues
+        dispatch: Dict[bytes, Handler] = {}
+        for query, handler in self._iter_handlers():
+            if query in dispatch:
+                logger.warning(
+                    "Query %r is used by both a %s and a %s, the %s is used."
+                    % (query, dispatch[query].kind, handler.kind, dispatch[query].kind)
+                )
+                continue
+            dispatch[query] = handler
 
-        # Try to match in the queries
-        if query in dialogues:
-            response = dialogues[query]
-            logger.debug("Found response in queries: %s" % repr(response))
+        self._dispatch = dispatch
+        self._setters.compile()
 
-            if "RANDOM" in response.decode("utf-8"):
-                response = random_response(response.decode("utf-8")).encode("utf-8")
+    # --- Private API
 
-            return response
+    #: Stores the queries accepted by the device.
+    #: query: response
+    _dialogues: Dict[bytes, Handler]
 
-        return None
+    #: Maps property names to value, type, validator
+    _properties: Dict[str, Property]
 
-    def _match_getters(
-        self,
-        query: bytes,
-        getters: Optional[Dict[bytes, Tuple[str, str]]] = None,
-    ) -> Optional[bytes]:
-        """Tries to match in getters
+    #: Stores the getter queries accepted by the device.
+    #: query: (property_name, response)
+    _getters: Dict[bytes, Handler]
+
+    #: Stores the setters queries accepted by the device.
+    _setters: SetterTable
+
+    #: Random generator used for random responses, None to use the global one.
+    _rng: Optional[random.Random]
+
+    #: Handlers of all the queries matched exactly, None if it needs to be compiled.
+    #: query: handler
+    _dispatch: Optional[Dict[bytes, Handler]]
+
+    #: Whether the command tables are shared with a clone and should be copied
+    #: before being modified.
+    _tables_shared: bool
+
+    def _own_tables(self) -> None:
+        """Copy the command tables shared with a clone before modifying them."""
+        if self._tables_shared:
+            self._dialogues = dict(self._dialogues)
+            self._getters = dict(self._getters)
+            self._setters = self._setters.copy()
+            self._tables_shared = False
+
+    def _discard_property(self, name: str) -> None:
+        """Remove the getter and setters of a property which is redefined."""
+        self._getters = {
+            q: h for q, h in self._getters.items() if getattr(h, "name", None) != name
+        }
+        self._setters = self._setters.without(name)
+
+    def _iter_handlers(self) -> Iterator[Tuple[bytes, Handler]]:
+        """Iterate over the queries matched exactly and their handler."""
+        yield from self._dialogues.items()
+        yield from self._getters.items()
+
+    def _match_dispatch(self, query: bytes) -> Optional[OptionalBytes]:
+        """Tries to match in the dispatch table, compiling it if necessary."""
+        if self._dispatch is None:
+            self.compile()
+            assert self._dispatch is not None
+
+        handler = self._dispatch.get(query)
+        if handler is None:
+            return None
+
+        return handler(self)
+
+    def _match_setters(self, query: bytes) -> Optional[OptionalBytes]:
+        """Tries to match in setters
 
         Parameters
         ----------
         query : bytes
             Query that we try to match to.
-        dialogues : Optional[Dict[bytes, bytes]], optional
-            Alternative getters to use when matching.
 
         Returns
         -------
@@ -338,25 +851,13 @@ class Component:
             Response if a dialog matched.
 
         """
-        if getters is None:
-            getters = self._getters
-
-        if query in getters:
-            name, response = getters[query]
-            logger.debug("Found response in getter of %s" % name)
-
-            if "RANDOM" in response:
-                response = random_response(response)
-            else:
-                value = self._properties[name].get_value()
-                response = response.format(value)
+        applied = self._apply_setters(query)
+        return None if applied is None else applied[2]
 
-            return response.encode("utf-8")
-
-        return None
-
-    def _match_setters(self, query: bytes) -> Optional[OptionalBytes]:
-        """Tries to match in setters
+    def _apply_setters(
+        self, query: bytes
+    ) -> Optional[Tuple[Optional[str], Any, OptionalBytes]]:
+        """Set a property using the first setter accepting the query.
 
         Parameters
         ----------
@@ -365,23 +866,21 @@ class Component:
 
         Returns
         -------
-        Optional[bytes]
-            Response if a dialog matched.
+        Optional[Tuple[Optional[str], Any, OptionalBytes]]
+            Name of the property and value it was set to (None if the value was
+            rejected) followed by the response, or None if no setter accepted the
+            query.
 
         """
         q = query.decode("utf-8")
-        for name, parser, response, error_response in self._setters:
-            try:
-                value = parser(q)
-                logger.debug("Found response in setter of %s" % name)
-            except ValueError:
-                continue
+        for (name, _, response, error_response), value in self._setters.parse(q):
+            logger.debug("Found response in setter of %s" % name)
 
             try:
                 self._properties[name].set_value(value)
-                return response
+                return name, value, response
             except ValueError:
                 if isinstance(error_response, bytes):
-                    return error_response
+                    return None, None, error_response
 
         return None
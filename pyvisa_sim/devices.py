@@ -6,13 +6,55 @@
 
 """
 
-from typing import Deque, Dict, List, Optional, Tuple, Union
+import copy
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from pyvisa import constants, rname
 
 from .channels import Channels
-from .common import int_to_byte, logger
-from .component import Component, NoResponse, OptionalBytes, to_bytes
+from .common import logger
+from .component import (
+    Component,
+    DialogueHandler,
+    Handler,
+    NoResponse,
+    OptionalBytes,
+    to_bytes,
+)
+
+
+@lru_cache()
+def _any_byte_pattern(stop_bytes: bytes) -> "re.Pattern[bytes]":
+    """Compile a pattern matching any of the provided bytes."""
+    return re.compile(b"[" + re.escape(stop_bytes) + b"]")
+
+
+def _find_any(data: bytes, stop_bytes: bytes, start: int, end: int) -> int:
+    """Find the first occurrence of any of the stop bytes in data[start:end].
+
+    Returns -1 if none of the bytes is present.
+
+    """
+    if len(stop_bytes) == 1:
+        return data.find(stop_bytes, start, end)
+
+    match = _any_byte_pattern(stop_bytes).search(data, start, end)
+    return match.start() if match else -1
 
 
 class StatusRegister:
@@ -104,6 +146,165 @@ class ErrorQueue:
     _default: bytes
 
 
+class RegisterHandler(Handler):
+    """Handler reading and clearing a status register."""
+
+    kind = "status register"
+
+    def __init__(self, query: bytes) -> None:
+        self.query = query
+
+    def __call__(self, component: "Component") -> OptionalBytes:
+        assert isinstance(component, Device)
+        register = component._status_registers[self.query]
+        response = register.value
+        logger.debug("Found response in status register: %s", repr(response))
+        register.clear()
+
+        return response
+
+
+class ErrorQueueHandler(Handler):
+    """Handler popping the oldest error of an error queue."""
+
+    kind = "error queue"
+
+    def __init__(self, query: bytes) -> None:
+        self.query = query
+
+    def __call__(self, component: "Component") -> OptionalBytes:
+        assert isinstance(component, Device)
+        response = component._error_queues[self.query].value
+        logger.debug("Found response in error queue: %s", repr(response))
+
+        return response
+
+
+class OutputBuffer:
+    """FIFO of the responses waiting to be read from a device.
+
+    Responses are stored as immutable bytes and consumed through a read cursor on
+    the oldest one, so that draining a response never shifts the remaining data.
+    Readers can block until a response is queued using :meth:`wait`.
+
+    """
+
+    def __init__(self) -> None:
+        self._responses = deque()
+        self._offset = 0
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def __bool__(self) -> bool:
+        return bool(self._responses)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_condition"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, response: bytes) -> None:
+        """Queue a complete response (including its end of message)."""
+        if response:
+            with self._condition:
+                self._responses.append(response)
+                self._size += len(response)
+                self._condition.notify_all()
+
+    def wait(
+        self, timeout: Optional[float], refresh: Optional[Callable[[], None]] = None
+    ) -> bool:
+        """Wait for data to be available for at most timeout seconds.
+
+        If provided, refresh is called with the lock held each time the waiting
+        thread is woken up, before checking whether data are available.
+
+        Returns whether data are available.
+
+        """
+        with self._condition:
+            if refresh is None:
+                return self._condition.wait_for(self.__bool__, timeout)
+
+            def ready() -> bool:
+                refresh()
+                return bool(self._responses)
+
+            return self._condition.wait_for(ready, timeout)
+
+    def notify(self) -> None:
+        """Wake up the threads waiting for data, without queuing any."""
+        with self._condition:
+            self._condition.notify_all()
+
+    def read(self, count: int) -> Tuple[bytes, bool]:
+        """Read at most count bytes from the oldest response.
+
+        Returns the data and whether the response has been completely consumed.
+
+        """
+        return self.read_until(b"", count)
+
+    def read_until(self, stop_bytes: bytes, count: int) -> Tuple[bytes, bool]:
+        """Read from the oldest response up to and including the first stop byte.
+
+        At most count bytes are returned. Returns the data and whether the response
+        has been completely consumed.
+
+        """
+        with self._condition:
+            if not self._responses:
+                return b"", False
+            return self._consume(stop_bytes, count)
+
+    def clear(self) -> None:
+        with self._condition:
+            self._responses.clear()
+            self._offset = 0
+            self._size = 0
+
+    # --- Private API
+
+    #: Responses waiting to be read.
+    _responses: Deque[bytes]
+
+    #: Position of the read cursor in the oldest response.
+    _offset: int
+
+    #: Number of bytes waiting to be read.
+    _size: int
+
+    #: Condition notified when a new response is queued.
+    _condition: threading.Condition
+
+    def _consume(self, stop_bytes: bytes, count: int) -> Tuple[bytes, bool]:
+        """Consume data from the oldest response, the lock must be held."""
+        response = self._responses[0]
+        start = self._offset
+        end = min(start + count, len(response))
+        if stop_bytes:
+            index = _find_any(response, stop_bytes, start, end)
+            if index >= 0:
+                end = index + 1
+
+        chunk = response if start == 0 and end == len(response) else response[start:end]
+        self._size -= end - start
+        if end < len(response):
+            self._offset = end
+            return chunk, False
+        else:
+            self._responses.popleft()
+            self._offset = 0
+            return chunk, True
+
+
 class Device(Component):
     """A representation of a responsive device
 
@@ -122,10 +323,15 @@ class Device(Component):
     #: Special character use to delimit multiple messages.
     delimiter: bytes
 
+    #: Whether commands are logged when written and only evaluated when the
+    #: device output is needed (see flush).
+    lazy: bool
+
     def __init__(self, name: str, delimiter: bytes) -> None:
         super(Device, self).__init__()
         self.name = name
         self.delimiter = delimiter
+        self.lazy = False
         self._resource_name = None
         self._query_eom = b""
         self._response_eom = b""
@@ -134,9 +340,14 @@ class Device(Component):
         self._status_registers = {}
         self._error_map = {}
         self._eoms = {}
-        self._output_buffers = Deque()
+        self._output_buffer = OutputBuffer()
         self._input_buffer = bytearray()
+        self._framed = None
+        self._framed_errors = {}
         self._error_queues = {}
+        self._pending = []
+        self._pending_sets = {}
+        self._known_sets = {}
 
     @property
     def resource_name(self) -> Optional[str]:
@@ -157,14 +368,62 @@ class Device(Component):
                 "Using LF." % (p.interface_type_const, p.resource_class)
             )
             self._query_eom, self._response_eom = b"\n", b"\n"
+        self._framed = None
+
+    def clone(self, channel_ids: Optional[Dict[str, List[str]]] = None) -> "Device":
+        """Create a device sharing the command tables of this one.
+
+        The clone is not bound to any resource and has its own properties, status
+        registers, error queues and buffers.
+
+        Parameters
+        ----------
+        channel_ids : Optional[Dict[str, List[str]]]
+            Ids of the activated channels by channels name, overriding the ones
+            of this device.
+
+        """
+        clone = super().clone()
+        channel_ids = channel_ids or {}
+        clone._channels = {
+            ch_name: channels.clone(clone, channel_ids.get(ch_name))
+            for ch_name, channels in self._channels.items()
+        }
+
+        registers: Dict[int, StatusRegister] = {}
+        for register in self._error_map.values():
+            registers.setdefault(id(register), copy.copy(register))
+        for register in self._status_registers.values():
+            registers.setdefault(id(register), copy.copy(register))
+        clone._status_registers = {
+            q: registers[id(r)] for q, r in self._status_registers.items()
+        }
+        clone._error_map = {k: registers[id(r)] for k, r in self._error_map.items()}
+        clone._error_queues = {}
+        for query, queue in self._error_queues.items():
+            clone._error_queues[query] = queue = copy.copy(queue)
+            queue._queue = list(queue._queue)
+
+        clone._resource_name = None
+        clone._output_buffer = OutputBuffer()
+        clone._input_buffer = bytearray()
+        clone._framed = None
+        clone._framed_errors = {}
+        clone._pending = []
+        clone._pending_sets = {}
+        clone._known_sets = {}
+        return clone
 
     def add_channels(self, ch_name: str, ch_obj: Channels) -> None:
         """Add a channel definition."""
+        self._own_tables()
         self._channels[ch_name] = ch_obj
+        self._dispatch = None
 
     # FIXME use a TypedDict
     def add_error_handler(self, error_input: Union[dict, str]):
         """Add error handler to the device"""
+        self._own_tables()
 
         if isinstance(error_input, dict):
             error_response = error_input.get("response", {})
@@ -195,6 +454,15 @@ class Device(Component):
         for key, value in response_dict.items():
             self._error_response[key] = to_bytes(value)
 
+        self._dispatch = None
+
+    def compile(self) -> None:
+        """Compile the dispatch tables of the device and its channels."""
+        self._framed = None
+        super().compile()
+        for channels in self._channels.values():
+            channels.compile()
+
     def error_response(self, error_key: str) -> Optional[bytes]:
         """Uupdate all error queues and return an error message if it exists."""
         if error_key in self._error_map:
@@ -220,6 +488,7 @@ class Device(Component):
             End of message used in responses.
 
         """
+        self._own_tables()
         i_t, resource_class = type_class.split(" ")
         interface_type = getattr(constants.InterfaceType, i_t.lower())
         self._eoms[(interface_type, resource_class)] = (
@@ -228,49 +497,99 @@ class Device(Component):
         )
 
     def write(self, data: bytes) -> None:
-        """Write data into the device input buffer."""
+        """Write data into the device input buffer.
+
+        Every complete message (terminated by the query end of message) is
+        processed as soon as it is received, such that multiple messages can be
+        sent in a single write and a message can be split across several writes.
+
+        """
         logger.debug("Writing into device input buffer: %r" % data)
         if not isinstance(data, bytes):
             raise TypeError("data must be an instance of bytes")
 
-        self._input_buffer.extend(data)
+        buffer = self._input_buffer
+        eom = self._query_eom
+        le = len(eom)
 
-        le = len(self._query_eom)
-        if not self._input_buffer.endswith(self._query_eom):
-            return
+        # Only the newly written bytes (and an end of message possibly started
+        # before them) need to be scanned.
+        scan_from = max(len(buffer) - le + 1, 0)
+        buffer.extend(data)
 
-        try:
-            message = bytes(self._input_buffer[:-le])
-            queries = message.split(self.delimiter) if self.delimiter else [message]
-            for query in queries:
-                response = self._match(query)
-                eom = self._response_eom
+        if not le:
+            messages = [bytes(buffer)]
+            buffer.clear()
+        else:
+            messages = []
+            start = 0
+            index = buffer.find(eom, scan_from)
+            while index >= 0:
+                messages.append(bytes(buffer[start:index]))
+                start = index + le
+                index = buffer.find(eom, start)
+            del buffer[:start]
+
+        for message in messages:
+            self._process_message(message)
+
+    def read(self, count: int = 1, stop_bytes: bytes = b"") -> Tuple[bytes, bool]:
+        """Return bytes from the output buffer and whether the last one is accompanied
+        by an END indicator.
 
-                if response is None:
-                    response = self.error_response("command_error")
-                    assert response is not None
+        Parameters
+        ----------
+        count : int, optional
+            Maximal number of bytes to return. Defaults to a single byte.
+        stop_bytes : bytes, optional
+            Bytes after which the returned chunk should end, such that the caller
+            can inspect them (termination character for example).
+
+        Returns
+        -------
+        bytes
+            Chunk of data that never spans more than a single response.
+        bool
+            Whether the chunk contains the last byte of a response.
+
+        """
+        if self._pending:
+            self.flush()
+        return self._output_buffer.read_until(stop_bytes, count)
 
-                if response is not NoResponse:
-                    self._output_buffers.append(bytearray(response) + eom)
+    def wait_for_output(self, timeout: Optional[float]) -> bool:
+        """Wait for at most timeout seconds for data to be available for reading.
 
-        finally:
-            self._input_buffer = bytearray()
+        Returns whether data are available.
 
-    def read(self) -> Tuple[bytes, bool]:
         """
-        Return a single byte from the output buffer and whether it is accompanied by an
-        END indicator.
+        # Commands logged in lazy mode while waiting are evaluated on wake up.
+        return self._output_buffer.wait(timeout, self.flush)
+
+    def flush(self) -> None:
+        """Evaluate the commands logged in lazy mode.
+
+        Commands identical to commands previously evaluated which set a property
+        to a valid value, without producing a response, are collapsed into the
+        last one setting the same property. Other commands are evaluated in order.
+
         """
-        if not self._output_buffers:
-            return b"", False
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = []
+        self._pending_sets.clear()
 
-        output_buffer = self._output_buffers[0]
-        b = int_to_byte(output_buffer.pop(0))
-        if output_buffer:
-            return b, False
-        else:
-            self._output_buffers.popleft()
-            return b, True
+        framed = self._get_framed()
+        properties = self._properties
+        for entry in pending:
+            if entry is None:
+                continue
+            query, known = entry
+            if known is None:
+                self._process_query(query, framed)
+            else:
+                properties[known[0]].set_value(known[1])
 
     # --- Private API
 
@@ -300,8 +619,8 @@ class Device(Component):
     #: TYPE CLASS -> (query termination, response termination)
     _eoms: Dict[Tuple[constants.InterfaceType, str], Tuple[bytes, bytes]]
 
-    #: Deque of buffers in which the user can read
-    _output_buffers: Deque[bytearray]
+    #: Buffer in which the user can read
+    _output_buffer: OutputBuffer
 
     #: Buffer in which the user can write
     _input_buffer: bytearray
@@ -309,66 +628,149 @@ class Device(Component):
     #: Mapping an error queue query and the queue.
     _error_queues: Dict[bytes, ErrorQueue]
 
-    def _match(self, query: bytes) -> Optional[OptionalBytes]:
-        """Tries to match in dialogues, getters and setters and channels."""
-        response: Optional[OptionalBytes]
-        response = self._match_dialog(query)
-        if response is not None:
-            return response
+    #: Static responses including the response end of message by query, None if
+    #: they need to be built.
+    _framed: Optional[Dict[bytes, bytes]]
 
-        response = self._match_getters(query)
-        if response is not None:
-            return response
+    #: Error responses including the response end of message.
+    _framed_errors: Dict[str, OptionalBytes]
 
-        response = self._match_registers(query)
-        if response is not None:
-            return response
+    #: Queries logged in lazy mode, along with the property name and value for
+    #: the known valid silent sets. Collapsed sets are replaced by None.
+    _pending: List[Optional[Tuple[bytes, Optional[Tuple[str, Any]]]]]
 
-        response = self._match_errors_queues(query)
-        if response is not None:
-            return response
+    #: Position in the pending log of the last collapsible set of each property.
+    _pending_sets: Dict[str, int]
 
-        response = self._match_setters(query)
-        if response is not None:
-            return response
+    #: Queries known to successfully set a property without producing a response.
+    #: query -> (property name, value)
+    _known_sets: Dict[bytes, Tuple[str, Any]]
 
-        if response is None:
-            for channel in self._channels.values():
-                response = channel.match(query)
-                if response:
-                    return response
+    def _own_tables(self) -> None:
+        """Copy the definitions shared with a clone before modifying them."""
+        if self._tables_shared:
+            self._channels = dict(self._channels)
+            self._error_response = dict(self._error_response)
+            self._eoms = dict(self._eoms)
+        super()._own_tables()
 
-        return None
+    def _process_message(self, message: bytes) -> None:
+        """Answer all the queries of a message, or log them in lazy mode."""
+        framed = self._get_framed()
 
-    def _match_registers(self, query: bytes) -> Optional[bytes]:
-        """Tries to match in status registers."""
-        if query in self._status_registers:
-            register = self._status_registers[query]
-            response = register.value
-            logger.debug("Found response in status register: %s", repr(response))
-            register.clear()
+        queries = message.split(self.delimiter) if self.delimiter else [message]
+        if not self.lazy:
+            for query in queries:
+                self._process_query(query, framed)
+            return
 
-            return response
+        pending = self._pending
+        pending_sets = self._pending_sets
+        known_sets = self._known_sets
+        for query in queries:
+            known = known_sets.get(query)
+            if known is None:
+                # The query may observe or alter any state so previous sets can
+                # no longer be collapsed.
+                pending_sets.clear()
+            else:
+                previous = pending_sets.get(known[0])
+                if previous is not None:
+                    pending[previous] = None
+                pending_sets[known[0]] = len(pending)
+            pending.append((query, known))
+
+        # Readers blocked on the output buffer evaluate the logged commands.
+        self._output_buffer.notify()
+
+    def _process_query(self, query: bytes, framed: Dict[bytes, bytes]) -> None:
+        """Answer a single query."""
+        # Static responses are queued without building a new bytes object.
+        if query in framed:
+            self._output_buffer.append(framed[query])
+            return
 
-        return None
+        response = self._match(query)
+
+        if response is None:
+            self.error_response("command_error")
+            response = self._framed_errors.get("command_error")
+            assert response is not None
+        elif response is not NoResponse:
+            response += self._response_eom
+
+        if response is not NoResponse:
+            self._output_buffer.append(response)
+
+    def _get_framed(self) -> Dict[bytes, bytes]:
+        """Static responses, built if necessary."""
+        if self._framed is None or self._dispatch is None:
+            self._frame()
+            assert self._framed is not None
+        return self._framed
+
+    def _frame(self) -> None:
+        """Build the static responses terminated by the response end of message."""
+        if self._dispatch is None:
+            self.compile()
+            assert self._dispatch is not None
+
+        eom = self._response_eom
+        self._framed = {
+            query: handler.response + eom
+            for query, handler in self._dispatch.items()
+            if isinstance(handler, DialogueHandler)
+            and handler.response is not NoResponse
+        }
+        self._framed_errors = {
+            key: response if response is NoResponse else response + eom
+            for key, response in self._error_response.items()
+        }
+        self._known_sets = {}
+
+    def _iter_handlers(self) -> Iterator[Tuple[bytes, Handler]]:
+        """Iterate over the queries matched exactly and their handler."""
+        yield from super()._iter_handlers()
+
+        for query in self._status_registers:
+            yield query, RegisterHandler(query)
+
+        for query in self._error_queues:
+            yield query, ErrorQueueHandler(query)
 
-    def _match_errors_queues(self, query: bytes) -> Optional[bytes]:
-        """Tries to match in error queues."""
-        if query in self._error_queues:
-            queue = self._error_queues[query]
-            response = queue.value
-            logger.debug("Found response in error queue: %s", repr(response))
+    def _match(self, query: bytes) -> Optional[OptionalBytes]:
+        """Tries to match in the dispatch table, setters and channels."""
+        response: Optional[OptionalBytes]
+        response = self._match_dispatch(query)
+        if response is not None:
+            return response
 
+        applied = self._apply_setters(query)
+        if applied is not None:
+            name, value, response = applied
+            if self.lazy and name is not None and response is NoResponse:
+                self._known_sets[query] = (name, value)
             return response
 
+        for channel in self._channels.values():
+            response = channel.match(query)
+            if response:
+                return response
+
         return None
 
 
 class Devices:
-    """The group of connected devices."""
+    """The group of connected devices.
+
+    Devices can be registered through a factory, in which case they are only built
+    when first accessed.
+
+    """
 
     def __init__(self) -> None:
         self._internal = {}
+        self._factories = {}
 
     def add_device(self, resource_name: str, device: Device) -> None:
         """Bind device to resource name"""
@@ -379,10 +781,68 @@ class Devices:
 
         device.resource_name = resource_name
 
-        self._internal[device.resource_name] = device
+        name = device.resource_name
+        assert name is not None
+        self._internal[name] = device
+
+    def add_device_factory(
+        self, resource_name: str, factory: Callable[[], Device]
+    ) -> None:
+        """Bind the device returned by factory on first access to resource name."""
+        name = str(rname.parse_resource_name(resource_name))
+        self._internal[name] = self._factories[name] = factory
+
+    def update(
+        self, factories: Iterable[Tuple[str, Callable[[], Device]]]
+    ) -> List[str]:
+        """Replace all the devices by the ones returned by new factories.
+
+        Resources whose new factory compares equal to the current one keep their
+        device (and its state), the others are built on next access.
+
+        Returns
+        -------
+        List[str]
+            Names of the resources which were added, removed or whose device will
+            be rebuilt.
+
+        """
+        internal: Dict[str, Union[Device, Callable[[], Device]]] = {}
+        current: Dict[str, Callable[[], Device]] = {}
+        changed = []
+        for resource_name, factory in factories:
+            name = str(rname.parse_resource_name(resource_name))
+            old = self._factories.get(name)
+            if old is not None and (old is factory or old == factory):
+                internal[name] = self._internal[name]
+                current[name] = old
+            else:
+                internal[name] = current[name] = factory
+                changed.append(name)
+        changed.extend(name for name in self._internal if name not in internal)
+
+        self._internal, self._factories = internal, current
+        return changed
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._internal
 
     def __getitem__(self, item: str) -> Device:
-        return self._internal[item]
+        device = self._internal[item]
+        if isinstance(device, Device):
+            return device
+
+        try:
+            built = device()
+        except KeyError as e:
+            # Do not let a malformed definition pass for a missing resource.
+            raise ValueError(
+                "Missing key %s in the definition of %s" % (e, item)
+            ) from e
+        # Replace the factory in place to preserve the order of the resources.
+        built.resource_name = item
+        self._internal[item] = built
+        return built
 
     def list_resources(self) -> Tuple[str, ...]:
         """List resource names.
@@ -393,5 +853,8 @@ class Devices:
 
     # --- Private API
 
-    #: Resource name to device map.
-    _internal: Dict[str, Device]
+    #: Resource name to device (or device factory) map.
+    _internal: Dict[str, Union[Device, Callable[[], Device]]]
+
+    #: Resource name to the factory of its device, if any.
+    _factories: Dict[str, Callable[[], Device]]
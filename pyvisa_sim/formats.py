@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Formats of the definition files other than YAML.
+
+Definitions can be written in JSON or TOML, following the same schema as YAML
+definitions. Those formats are much faster to parse and well suited to generated
+definitions.
+
+:copyright: 2014-2024 by PyVISA-sim Authors, see AUTHORS for more details.
+:license: MIT, see LICENSE for more details.
+
+"""
+
+import datetime
+import json
+import os
+import pathlib
+import re
+import sys
+from typing import Any, Dict, List, Union
+
+#: Format of the definition files by extension. Files with other extensions are
+#: assumed to be YAML files.
+FORMATS = {".json": "json", ".toml": "toml"}
+
+
+def get_format(filename: Union[str, pathlib.Path]) -> str:
+    """Format of a definition file deduced from its extension."""
+    return FORMATS.get(os.path.splitext(str(filename))[1].lower(), "yaml")
+
+
+def loads(content: str, fmt: str) -> Any:
+    """Parse JSON or TOML definitions.
+
+    All scalars are converted to str, as done when loading YAML definitions:
+    booleans become "true" and "false" and numbers keep their spelling in the
+    file, except TOML integers and dates which are written in canonical form
+    (e.g. 0x10 becomes "16").
+
+    """
+    if fmt == "json":
+        data = json.loads(content, parse_float=str, parse_int=str, parse_constant=str)
+    elif fmt == "toml":
+        if sys.version_info >= (3, 11):
+            import tomllib
+        else:
+            import tomli as tomllib
+        data = tomllib.loads(content, parse_float=str)
+    else:
+        raise ValueError("Unsupported definition format %s" % fmt)
+
+    return _stringify(data)
+
+
+def dumps(data: Dict[str, Any], fmt: str) -> str:
+    """Serialize definitions, whose scalars are all str, to JSON or TOML."""
+    if fmt == "json":
+        return json.dumps(data, indent=2, ensure_ascii=False) + "\n"
+    if fmt == "toml":
+        lines: List[str] = []
+        _dump_table(lines, [], data)
+        return "\n".join(lines).lstrip("\n") + "\n"
+    raise ValueError("Unsupported definition format %s" % fmt)
+
+
+# --- Private API
+
+#: Keys which can be written without quotes in TOML.
+_BARE_KEY = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _stringify(value: Any) -> Any:
+    """Convert all the scalars of a parsed document to str."""
+    if isinstance(value, dict):
+        return {str(k): _stringify(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_stringify(v) for v in value]
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _is_table_array(value: Any) -> bool:
+    """Check whether a value is written as an array of TOML tables."""
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(v, dict) for v in value)
+    )
+
+
+def _toml_key(key: str) -> str:
+    return key if _BARE_KEY.match(key) else json.dumps(key, ensure_ascii=False)
+
+
+def _toml_value(value: Any) -> str:
+    """Inline TOML representation of a value."""
+    if isinstance(value, str):
+        # JSON escapes are valid in TOML basic strings.
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, list):
+        return "[" + ", ".join(_toml_value(v) for v in value) + "]"
+    if isinstance(value, dict):
+        items = ("%s = %s" % (_toml_key(k), _toml_value(v)) for k, v in value.items())
+        return "{ " + ", ".join(items) + " }"
+    raise TypeError("Cannot write %r to a TOML definition file" % (value,))
+
+
+def _dump_table(lines: List[str], path: List[str], table: Dict[str, Any]) -> None:
+    """Write the content of a table, its sub-tables being written after its values."""
+    for key, value in table.items():
+        if not isinstance(value, dict) and not _is_table_array(value):
+            lines.append("%s = %s" % (_toml_key(key), _toml_value(value)))
+
+    for key, value in table.items():
+        name = ".".join(_toml_key(k) for k in [*path, key])
+        if isinstance(value, dict):
+            lines.extend(("", "[%s]" % name))
+            _dump_table(lines, [*path, key], value)
+        elif _is_table_array(value):
+            for item in value:
+                lines.extend(("", "[[%s]]" % name))
+                _dump_table(lines, [*path, key], item)
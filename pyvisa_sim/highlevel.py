@@ -9,18 +9,31 @@
 import random
 from collections import OrderedDict
 from traceback import format_exc
-from typing import Any, Dict, SupportsInt, Tuple, Union, overload
+from typing import TYPE_CHECKING, Any, Dict, List, SupportsInt, Tuple, Union, overload
 
 import pyvisa.errors as errors
 from pyvisa import constants, highlevel, rname
 from pyvisa.typing import VISAEventContext, VISARMSession, VISASession
 from pyvisa.util import LibraryPath
 
-# This import is required to register subclasses
-from . import parser
-from .sessions import gpib, serial, tcpip, usb  # noqa
 from .sessions.session import Session
 
+if TYPE_CHECKING:
+    from .devices import Devices
+
+# The session classes are only imported when a resource of their type is opened.
+for _interface_type, _resource_class, _module in (
+    (constants.InterfaceType.gpib, "INSTR", "gpib"),
+    (constants.InterfaceType.asrl, "INSTR", "serial"),
+    (constants.InterfaceType.tcpip, "INSTR", "tcpip"),
+    (constants.InterfaceType.tcpip, "SOCKET", "tcpip"),
+    (constants.InterfaceType.usb, "INSTR", "usb"),
+    (constants.InterfaceType.usb, "RAW", "usb"),
+):
+    Session.register_module(
+        _interface_type, _resource_class, "%s.sessions.%s" % (__package__, _module)
+    )
+
 
 class SimVisaLibrary(highlevel.VisaLibraryBase):
     """A pure Python backend for PyVISA.
@@ -43,6 +56,12 @@ class SimVisaLibrary(highlevel.VisaLibraryBase):
     #: Maps session handle to session objects.
     sessions: Dict[VISASession, Session]
 
+    #: Devices simulated by the library.
+    devices: "Devices"
+
+    #: Definition file of the library (path or name of the bundled file, bundled).
+    _definition_file: Tuple[str, bool]
+
     @staticmethod
     def get_library_paths() -> Tuple[LibraryPath]:
         """List a dummy library path to allow to create the library."""
@@ -60,13 +79,53 @@ class SimVisaLibrary(highlevel.VisaLibraryBase):
 
         return d
 
+    def reload(self) -> List[str]:
+        """Reload the definition file if it, or a file it references, changed.
+
+        Only the devices whose definition changed are rebuilt and the sessions
+        opened on them are bound to the new devices. The other devices, and the
+        sessions opened on them, keep their state. Detecting that no file changed
+        only requires to check their modification time, including when the
+        library uses a compiled artifact, so this method can be called
+        periodically.
+
+        Returns
+        -------
+        List[str]
+            Names of the resources which were added, removed or whose device was
+            rebuilt.
+
+        """
+        from . import parser
+
+        try:
+            definitions = parser.get_definitions(*self._definition_file)
+        except Exception as e:
+            msg = "Could not parse definitions file. %r"
+            raise type(e)(msg % format_exc())
+
+        changed = self.devices.update(definitions)
+        for sess in self.sessions.values():
+            if not isinstance(sess, Session):
+                continue
+            r_name = sess.attrs[constants.ResourceAttribute.resource_name]
+            if r_name in changed and r_name in self.devices:
+                assert isinstance(r_name, str)
+                sess.device = self.devices[r_name]
+
+        return changed
+
     def _init(self) -> None:
+        # Parsing definitions requires heavy dependencies, only import them now.
+        from . import parser
+
         self.sessions: Dict[int, Session] = {}
+        if self.library_path == "unset":
+            self._definition_file = ("default.yaml", True)
+        else:
+            self._definition_file = (self.library_path, False)
         try:
-            if self.library_path == "unset":
-                self.devices = parser.get_devices("default.yaml", True)
-            else:
-                self.devices = parser.get_devices(self.library_path, False)
+            self.devices = parser.get_devices(*self._definition_file)
         except Exception as e:
             msg = "Could not parse definitions file. %r"
             raise type(e)(msg % format_exc())
@@ -7,8 +7,12 @@
 """
 
 import importlib.resources
+import itertools
 import os
 import pathlib
+import posixpath
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import closing
 from io import StringIO, open
 from traceback import format_exc
@@ -16,18 +20,21 @@ from typing import (
     Any,
     BinaryIO,
     Dict,
-    Generic,
+    List,
     Literal,
-    Mapping,
+    Optional,
+    Sequence,
+    Set,
     TextIO,
     Tuple,
-    TypeVar,
     Union,
 )
 
 import yaml
 
+from . import artifact, cache, formats
 from .channels import Channels
+from .common import logger
 from .component import Component, NoResponse, Responses
 from .devices import Device, Devices
 
@@ -41,25 +48,18 @@ SPEC_VERSION = "1.1"
 
 SPEC_VERSION_TUPLE = _ver_to_tuple(SPEC_VERSION)
 
+#: Loader used to parse definition files. All scalars are loaded as str, the libyaml
+#: based loader being used when PyYAML was built with it.
+YAML_LOADER = getattr(yaml, "CBaseLoader", yaml.loader.BaseLoader)
 
-# FIXME does not allow to alter an inherited dialogue, property, etc
-K = TypeVar("K")
-V = TypeVar("V")
+#: Minimal number of referenced files for them to be parsed concurrently.
+PARALLEL_PARSING_MIN_FILES = 4
 
-
-class SimpleChainmap(Generic[K, V]):
-    """Combine multiple mappings for sequential lookup."""
-
-    def __init__(self, *maps: Mapping[K, V]) -> None:
-        self._maps = maps
-
-    def __getitem__(self, key: K) -> V:
-        for mapping in self._maps:
-            try:
-                return mapping[key]
-            except KeyError:
-                pass
-        raise KeyError(key)
+#: Parse the referenced files in worker processes rather than threads when the
+#: pure Python YAML loader is used. Worker processes may import the __main__
+#: module again (spawn and forkserver start methods), so this should only be
+#: enabled by programs whose entry point is guarded by if __name__ == "__main__".
+PARALLEL_PARSING_PROCESSES = False
 
 
 def _get_pair(dd: Dict[str, str]) -> Tuple[str, str]:
@@ -78,12 +78,26 @@ def _get_triplet(
     )
 
 
-def _load(content_or_fp: Union[str, bytes, TextIO, BinaryIO]) -> Dict[str, Any]:
-    """YAML Parse a file or str and check version."""
+def _load(
+    content_or_fp: Union[str, bytes, TextIO, BinaryIO], fmt: str = "yaml"
+) -> Dict[str, Any]:
+    """Parse a file or str in the given format (yaml, json or toml) and check version."""
     try:
-        data = yaml.load(content_or_fp, Loader=yaml.loader.BaseLoader)
+        if fmt == "yaml":
+            data = yaml.load(content_or_fp, Loader=YAML_LOADER)
+        else:
+            content = content_or_fp
+            if not isinstance(content, (str, bytes)):
+                content = content.read()
+            if isinstance(content, bytes):
+                content = content.decode("utf-8")
+            data = formats.loads(content, fmt)
     except Exception as e:
-        raise type(e)("Malformed yaml file:\n%r" % format_exc())
+        msg = "Malformed %s file:\n%r" % (fmt, format_exc())
+        if fmt != "yaml":
+            # JSON and TOML errors cannot be built from a message alone.
+            raise ValueError(msg) from e
+        raise type(e)(msg)
 
     try:
         ver = data["spec"]
@@ -113,13 +127,66 @@ def parse_resource(name: str) -> Dict[str, Any]:
     with closing(importlib.resources.open_binary("pyvisa_sim", name)) as fp:
         rbytes = fp.read()
 
-    return _load(StringIO(rbytes.decode("utf-8")))
+    return _load(StringIO(rbytes.decode("utf-8")), formats.get_format(name))
 
 
 def parse_file(fullpath: Union[str, pathlib.Path]) -> Dict[str, Any]:
-    """Parse a file."""
+    """Parse a file, its format (YAML, JSON or TOML) depending on its extension."""
     with open(fullpath, encoding="utf-8") as fp:
-        return _load(fp)
+        return _load(fp, formats.get_format(fullpath))
+
+
+#: Content of a parsed file or the error raised while parsing it.
+ParseResult = Tuple[Optional[Dict[str, Any]], Optional[Exception]]
+
+
+def _parse_source(filename: Union[str, pathlib.Path], bundled: bool) -> ParseResult:
+    """Parse a file or resource, returning the error rather than raising it."""
+    try:
+        if bundled:
+            assert isinstance(filename, str)
+            return parse_resource(filename), None
+        return parse_file(filename), None
+    except Exception as e:
+        return None, e
+
+
+def _parse_sources(
+    sources: Sequence[Tuple[str, bool]],
+) -> Dict[Tuple[str, bool], ParseResult]:
+    """Parse several files concurrently.
+
+    Threads are used unless there are too few files to benefit from it, or
+    processes with the pure Python loader if PARALLEL_PARSING_PROCESSES is
+    enabled. Files which could not be handled by the pool are missing from the
+    result and are parsed again when needed.
+
+    """
+    if len(sources) < PARALLEL_PARSING_MIN_FILES:
+        return {source: _parse_source(*source) for source in sources}
+
+    executor: Executor
+    workers = min(len(sources), os.cpu_count() or 1)
+    if PARALLEL_PARSING_PROCESSES and YAML_LOADER is yaml.loader.BaseLoader:
+        executor = ProcessPoolExecutor(workers)
+    else:
+        executor = ThreadPoolExecutor(workers)
+
+    results = {}
+    try:
+        with executor:
+            futures = {
+                source: executor.submit(_parse_source, *source) for source in sources
+            }
+            for source, future in futures.items():
+                try:
+                    results[source] = future.result()
+                except Exception as e:
+                    logger.debug("Failed to parse %s concurrently: %r" % (source[0], e))
+    except Exception as e:
+        logger.debug("Failed to parse definition files concurrently: %r" % e)
+
+    return results
 
 
 def update_component(
@@ -151,21 +218,6 @@ def update_component(
             raise type(e)(msg % (name, prop_name, format_exc()))
 
 
-def get_bases(definition_dict: Dict[str, Any], loader: "Loader") -> Dict[str, Any]:
-    """Collect inherited behaviors."""
-    bases = definition_dict.get("bases", ())
-    if bases:
-        # FIXME this currently does not work
-        raise NotImplementedError
-        bases = (
-            loader.get_comp_dict(required_version=SPEC_VERSION_TUPLE[0], **b)  # type: ignore
-            for b in bases
-        )
-        return SimpleChainmap(definition_dict, *bases)
-    else:
-        return definition_dict
-
-
 def get_channel(
     device: Device,
     ch_name: str,
@@ -193,20 +245,35 @@ def get_channel(
     Channels:
         Channels for the device.
 
+    Raises
+    ------
+    ValueError
+        Raised if the channels definition specifies bases.
+
     """
-    cd = get_bases(channel_dict, loader)
+    _check_channels(ch_name, channel_dict)
 
     r_ids = resource_dict.get("channel_ids", {}).get(ch_name, [])
     ids = r_ids if r_ids else channel_dict.get("ids", {})
 
-    can_select = False if channel_dict.get("can_select") == "False" else True
+    can_select = channel_dict.get("can_select", "").lower() != "false"
     channels = Channels(device, ids, can_select)
+    channels.set_setter_engine(channel_dict.get("setter_engine", device.setter_engine))
 
-    update_component(ch_name, channels, cd)
+    update_component(ch_name, channels, channel_dict)
 
     return channels
 
 
+def _check_channels(ch_name: str, channel_dict: Dict[str, Any]) -> None:
+    """Reject the keys which are not supported in a channels definition."""
+    if "bases" in channel_dict:
+        raise ValueError(
+            "In channels %s, bases are not supported in channels definitions, "
+            "use bases on the device defining the channels instead." % ch_name
+        )
+
+
 def get_device(
     name: str,
     device_dict: Dict[str, Any],
@@ -232,24 +299,281 @@ def get_device(
         Accessed device
 
     """
-    device = Device(name, device_dict.get("delimiter", ";").encode("utf-8"))
+    bases = device_dict.get("bases", ())
+    if bases:
+        # The device shares the command tables of its first base until it
+        # redefines some of them.
+        base = get_base_device(bases[0], loader, resource_dict)
+        device = base.clone(resource_dict.get("channel_ids"))  # type: ignore
+        device.name = name
+        for base_spec in bases[1:]:
+            _update_device_with_base(device, base_spec, loader, resource_dict, set())
+
+    else:
+        device = Device(name, b";")
+
+        seed = loader.data.get("random_seed")
+        device.set_random_seed(None if seed is None else int(seed))
+
+        if "error" not in device_dict:
+            device.add_error_handler({})
+
+    _update_device(device, device_dict, loader, resource_dict)
+
+    # Devices which did not alter their base keep its compiled tables.
+    if device._dispatch is None:
+        device.compile()
+
+    return device
+
+
+def get_base_device(
+    base_spec: Union[str, Dict[str, str]],
+    loader: "Loader",
+    resource_dict: Dict[str, str],
+) -> Device:
+    """Get the device built from a base definition, shared by all derived devices.
+
+    Parameters
+    ----------
+    base_spec : Union[str, Dict[str, str]]
+        Name of the base device or dictionary specifying the device name and
+        optionally the file (filename and bundled) defining it.
+    loader : Loader
+        Global loader centralizing all devices information.
+    resource_dict : Dict[str, str]
+        Resource information of the derived device, used to find the file
+        defining the base if none is specified.
+
+    Returns
+    -------
+    Device
+        Device which should be cloned and not used directly.
+
+    """
+    key = _get_base_key(base_spec, resource_dict)
+    prototypes = loader._prototypes
+    if key in prototypes:
+        prototype = prototypes[key]
+        if prototype is None:
+            raise ValueError("Circular bases involving device %s" % key[0])
+        return prototype
+
+    prototypes[key] = None
+    try:
+        name, filename, bundled = key
+        file_dict = {"filename": filename, "bundled": bundled}
+        device_dict = loader.get_device_dict(
+            name, filename, bundled, SPEC_VERSION_TUPLE[0]
+        )
+        prototype = get_device(name, device_dict, loader, file_dict)
+    except BaseException:
+        del prototypes[key]
+        raise
+
+    prototypes[key] = prototype
+    return prototype
+
+
+def _get_base_key(
+    base_spec: Union[str, Dict[str, str]], resource_dict: Dict[str, str]
+) -> Tuple[str, Any, Any]:
+    """Device name, filename and bundled flag identifying a base definition."""
+    if isinstance(base_spec, str):
+        base_spec = {"device": base_spec}
+    if "filename" in base_spec:
+        return (
+            base_spec["device"],
+            base_spec["filename"],
+            base_spec.get("bundled", False),
+        )
+    # Bases are looked up in the file in which the device is defined.
+    return (
+        base_spec["device"],
+        resource_dict.get("filename", None),
+        resource_dict.get("bundled", False),
+    )
 
-    device_dict = get_bases(device_dict, loader)
 
-    err = device_dict.get("error", {})
-    device.add_error_handler(err)
+def _update_device_with_base(
+    device: Device,
+    base_spec: Union[str, Dict[str, str]],
+    loader: "Loader",
+    resource_dict: Dict[str, str],
+    applying: Set[Tuple[str, Any, Any]],
+) -> None:
+    """Add the definitions of a base device, preceded by its own bases, to a device.
+
+    applying holds the bases whose definitions are being applied, a base found
+    in it refers to itself through its bases.
+
+    """
+    key = _get_base_key(base_spec, resource_dict)
+    if key in applying:
+        raise ValueError("Circular bases involving device %s" % key[0])
+
+    name, filename, bundled = key
+    base_dict = loader.get_device_dict(name, filename, bundled, SPEC_VERSION_TUPLE[0])
+    # Bases of the base are looked up in the file defining it.
+    file_dict = dict(resource_dict, filename=filename, bundled=bundled)
+
+    applying.add(key)
+    for spec in base_dict.get("bases", ()):
+        _update_device_with_base(device, spec, loader, file_dict, applying)
+    applying.remove(key)
+
+    _update_device(device, base_dict, loader, file_dict)
+
+
+def _update_device(
+    device: Device,
+    device_dict: Dict[str, Any],
+    loader: "Loader",
+    resource_dict: Dict[str, str],
+) -> None:
+    """Add the definitions of a device dictionary to a device.
+
+    Definitions already present in the device are overridden.
+
+    """
+    if "delimiter" in device_dict:
+        device.delimiter = device_dict["delimiter"].encode("utf-8")
+
+    if "setter_engine" in device_dict:
+        device.set_setter_engine(device_dict["setter_engine"])
+
+    if "random_seed" in device_dict:
+        device.set_random_seed(int(device_dict["random_seed"]))
+
+    if "lazy" in device_dict:
+        device.lazy = device_dict["lazy"].lower() == "true"
+
+    if "error" in device_dict:
+        device.add_error_handler(device_dict["error"])
 
     for itype, eom_dict in device_dict.get("eom", {}).items():
         device.add_eom(itype, *_get_pair(eom_dict))
 
-    update_component(name, device, device_dict)
+    update_component(device.name, device, device_dict)
 
     for ch_name, ch_dict in device_dict.get("channels", {}).items():
         device.add_channels(
             ch_name, get_channel(device, ch_name, ch_dict, loader, resource_dict)
         )
 
-    return device
+
+#: Template found in a resource name.
+_TEMPLATE = re.compile(r"\{([^{}]*)\}")
+
+
+def expand_resource_name(resource_name: str) -> List[str]:
+    """Expand the templates found in a resource name.
+
+    A template is enclosed in braces and is either an inclusive range of integers
+    ({1..8}) or a comma separated list of values ({a,b}). Resource names with
+    several templates produce all the combinations.
+
+    """
+    parts = _TEMPLATE.split(resource_name)
+    if len(parts) == 1:
+        return [resource_name]
+
+    choices: List[List[str]] = []
+    for template in parts[1::2]:
+        if ".." in template:
+            start, _, stop = template.partition("..")
+            try:
+                choices.append([str(i) for i in range(int(start), int(stop) + 1)])
+            except ValueError:
+                raise ValueError(
+                    "Invalid range {%s} in resource name %s" % (template, resource_name)
+                ) from None
+        else:
+            choices.append([v.strip() for v in template.split(",")])
+
+    names = []
+    for values in itertools.product(*choices):
+        pieces = list(parts)
+        pieces[1::2] = values
+        names.append("".join(pieces))
+    return names
+
+
+class DeviceTemplate:
+    """Factory of the devices bound to the resources of an entry in a file.
+
+    The device is built once and each call returns a clone sharing its command
+    tables, such that all the resources produced by a template, or opened from
+    different libraries, hold their own state.
+
+    Parameters
+    ----------
+    name : str
+        Name identifying the device.
+    device_dict : Dict[str, Any]
+        Dictionary describing the device.
+    loader : Loader
+        Global loader centralizing all devices information.
+    resource_dict : Dict[str, str]
+        Resource information to which the devices are attached.
+    definition_file : Optional[cache.Source]
+        Definition file whose cached definitions include the template. They are
+        stored again once the device is built.
+
+    """
+
+    def __init__(
+        self,
+        name: str,
+        device_dict: Dict[str, Any],
+        loader: "Loader",
+        resource_dict: Dict[str, str],
+        definition_file: Optional[cache.Source] = None,
+    ) -> None:
+        self._definition = (name, device_dict, loader, resource_dict)
+        self._definition_file = definition_file
+        self._prototype = None
+
+    def __call__(self) -> Device:
+        return self.build().clone()
+
+    def build(self) -> Device:
+        """Build the device cloned for each resource, if not done yet, and return it."""
+        if self._prototype is None:
+            self._prototype = get_device(*self._definition)
+            if self._definition_file is not None:
+                cache.update_definitions(*self._definition_file)
+        return self._prototype
+
+    def __eq__(self, other: object) -> bool:
+        """Templates are equal if they build devices from the same definitions."""
+        if not isinstance(other, DeviceTemplate):
+            return NotImplemented
+        return self._signature() == other._signature()
+
+    __hash__ = None  # type: ignore
+
+    # --- Private API
+
+    #: Arguments of get_device used to build the prototype.
+    _definition: Tuple[str, Dict[str, Any], "Loader", Dict[str, str]]
+
+    #: Definition file whose cached definitions include the template.
+    _definition_file: Optional[cache.Source]
+
+    #: Device cloned for each resource, None until first needed.
+    _prototype: Optional[Device]
+
+    def _signature(self) -> Tuple[Any, ...]:
+        """Everything the device depends on, including the definitions of its bases."""
+        name, device_dict, loader, resource_dict = self._definition
+        return (
+            name,
+            device_dict,
+            resource_dict,
+            loader.data.get("random_seed"),
+            _load_bases(device_dict, loader, resource_dict, set()),
+        )
 
 
 class Loader:
@@ -267,10 +591,20 @@ class Loader:
     #: Definitions loaded from a YAML file.
     data: Dict[str, Any]
 
+    #: Number of times a file was found already loaded.
+    hits: int
+
+    #: Number of files parsed.
+    misses: int
+
     def __init__(self, filename: Union[str, pathlib.Path], bundled: bool):
         self._cache = {}
+        self._parsed = {}
+        self._prototypes = {}
         self._filename = filename
         self._bundled = bundled
+        self.hits = 0
+        self.misses = 0
         self.data = self._load(filename, bundled, SPEC_VERSION_TUPLE[0])
 
     def load(
@@ -299,14 +633,41 @@ class Loader:
             msg = "Only other bundled files can be loaded from bundled files."
             raise ValueError(msg)
 
-        if parent is None:
-            parent = self._filename
+        return self._load(
+            self._resolve(filename, bundled, parent), bundled, required_version
+        )
 
-        base = os.path.dirname(parent)
+    def preload(self) -> None:
+        """Parse concurrently all the files referenced by the loaded file.
 
-        filename = os.path.join(base, filename)
+        The files referenced by resources and bases are looked up, following the
+        bases defined in the referenced files. The content of a file, or the error
+        raised while parsing it, is only used once the file is loaded, so that
+        loading the files gives the same results and reports the same errors as
+        without preloading.
 
-        return self._load(filename, bundled, required_version)
+        """
+        pending = _get_references(self.data, True)
+        while pending:
+            sources = []
+            for filename, bundled in pending:
+                if self._bundled and not bundled:
+                    continue
+                source = (
+                    _canonical_source(self._resolve(filename, bundled), bundled),
+                    bundled,
+                )
+                if source not in self._cache and source not in self._parsed:
+                    sources.append(source)
+            sources = list(dict.fromkeys(sources))
+
+            parsed = _parse_sources(sources)
+            self._parsed.update(parsed)
+
+            pending = []
+            for data, _ in parsed.values():
+                if data is not None:
+                    pending.extend(_get_references(data, False))
 
     def get_device_dict(
         self,
@@ -339,8 +700,16 @@ class Loader:
 
     # --- Private API
 
-    #: (absolute path / resource name / None, bundled) -> dict
-    _cache: Dict[Tuple[Union[str, pathlib.Path, None], bool], Dict[str, str]]
+    #: Loaded files by canonical source (see _canonical_source).
+    #: (real path / normalized resource name, bundled) -> dict
+    _cache: Dict[Tuple[str, bool], Dict[str, str]]
+
+    #: Files parsed ahead of being loaded by preload.
+    _parsed: Dict[Tuple[str, bool], ParseResult]
+
+    #: Devices built from base definitions by (device, filename, bundled), None
+    #: while being built.
+    _prototypes: Dict[Tuple[str, Any, Any], Optional[Device]]
 
     #: Path the first loaded file.
     _filename: Union[str, pathlib.Path]
@@ -348,6 +717,22 @@ class Loader:
     #: Is the loader working with bundled resources.
     _bundled: bool
 
+    def _resolve(
+        self,
+        filename: Union[str, pathlib.Path],
+        bundled: bool,
+        parent: Union[str, pathlib.Path, None] = None,
+    ) -> Union[str, pathlib.Path]:
+        """Locate a file referenced from a definition file."""
+        if bundled:
+            # Bundled files are identified by their name in the package.
+            return filename
+
+        if parent is None:
+            parent = self._filename
+
+        return os.path.join(os.path.dirname(parent), filename)
+
     def _load(
         self, filename: Union[str, pathlib.Path], bundled: bool, required_version: int
     ) -> Dict[str, Any]:
@@ -356,11 +741,19 @@ class Loader:
         The major version of the definition must match.
 
         """
+        filename = _canonical_source(filename, bundled)
         if (filename, bundled) in self._cache:
+            self.hits += 1
             return self._cache[(filename, bundled)]
 
-        if bundled:
-            assert isinstance(filename, str)
+        self.misses += 1
+        if (filename, bundled) in self._parsed:
+            parsed, error = self._parsed.pop((filename, bundled))
+            if error is not None:
+                raise error
+            assert parsed is not None
+            data = parsed
+        elif bundled:
             data = parse_resource(filename)
         else:
             data = parse_file(filename)
@@ -377,9 +770,25 @@ class Loader:
         return data
 
 
+def _canonical_source(filename: Union[str, pathlib.Path], bundled: bool) -> str:
+    """Identifier of a file independent of how its name is spelled.
+
+    Files are identified by their real absolute path and bundled files by their
+    normalized name in the package.
+
+    """
+    if bundled:
+        return posixpath.normpath(str(filename).replace(os.sep, "/"))
+    return os.path.realpath(filename)
+
+
 def get_devices(filename: Union[str, pathlib.Path], bundled: bool) -> Devices:
     """Get a Devices object from a file.
 
+    The definitions are reused from previous calls, or from the on disk cache
+    (see pyvisa_sim.cache), if the file and the files it references did not change
+    since they were parsed. Each call returns new devices.
+
     Parameters
     ----------
     filename : Union[str, pathlib.Path]
@@ -394,11 +803,45 @@ def get_devices(filename: Union[str, pathlib.Path], bundled: bool) -> Devices:
 
     """
 
-    loader = Loader(filename, bundled)
     devices = Devices()
+    for resource_name, factory in get_definitions(filename, bundled):
+        devices.add_device_factory(resource_name, factory)
+
+    return devices
+
+
+def get_definitions(
+    filename: Union[str, pathlib.Path], bundled: bool
+) -> cache.Definitions:
+    """Get the resource names found in a file and the factories of their device.
 
-    # Iterate through the resources and generate each individual device
-    # on demand.
+    The factories are shared by all the callers accessing the same (unmodified)
+    file and return a new device on each call. Artifacts produced by
+    ``pyvisa-sim compile`` are read as is.
+
+    Parameters
+    ----------
+    filename : Union[str, pathlib.Path]
+        Full path of the file to parse or name of the resource.
+    bundled : bool
+        Is the definition file bundled in pyvisa-sim.
+
+    """
+    definitions = cache.load_definitions(filename, bundled)
+    if definitions is not None:
+        return definitions
+
+    if not bundled and artifact.is_artifact(filename):
+        definitions = artifact.read_artifact(filename)
+        cache.register_definitions(filename, bundled, definitions)
+        return definitions
+
+    loader = Loader(filename, bundled)
+    loader.preload()
+    definitions = []
+
+    # Iterate through the resources and register how to generate each individual
+    # device on demand.
 
     for resource_name, resource_dict in loader.data.get("resources", {}).items():
         device_name = resource_dict["device"]
@@ -409,9 +852,74 @@ def get_devices(filename: Union[str, pathlib.Path], bundled: bool) -> Devices:
             resource_dict.get("bundled", False),
             SPEC_VERSION_TUPLE[0],
         )
-
-        devices.add_device(
-            resource_name, get_device(device_name, dd, loader, resource_dict)
+        # Load the files defining the bases now so that they are known sources.
+        bases = _load_bases(dd, loader, resource_dict, set())
+        for definition in (dd, *bases):
+            for ch_name, channel_dict in definition.get("channels", {}).items():
+                try:
+                    _check_channels(ch_name, channel_dict)
+                except ValueError as e:
+                    raise ValueError("In device %s, %s" % (device_name, e)) from e
+
+        template = DeviceTemplate(
+            device_name, dd, loader, resource_dict, (filename, bundled)
         )
+        for name in expand_resource_name(resource_name):
+            definitions.append((name, template))
 
-    return devices
+    # Files parsed ahead of time but never used are not part of the definitions.
+    loader._parsed.clear()
+
+    cache.store_definitions(filename, bundled, list(loader._cache), definitions)
+
+    return definitions
+
+
+def _get_references(
+    data: Dict[str, Any], with_resources: bool
+) -> List[Tuple[str, bool]]:
+    """Files referenced by the bases, and optionally the resources, of a file.
+
+    Malformed entries are skipped, they are reported when actually used.
+
+    """
+    entries = []
+    if with_resources and isinstance(data.get("resources"), dict):
+        entries.extend(data["resources"].values())
+    if isinstance(data.get("devices"), dict):
+        for device_dict in data["devices"].values():
+            if isinstance(device_dict, dict) and isinstance(
+                device_dict.get("bases"), list
+            ):
+                entries.extend(device_dict["bases"])
+
+    references = []
+    for entry in entries:
+        if isinstance(entry, dict) and isinstance(entry.get("filename"), str):
+            references.append((entry["filename"], entry.get("bundled", False)))
+    return references
+
+
+def _load_bases(
+    device_dict: Dict[str, Any],
+    loader: "Loader",
+    resource_dict: Dict[str, str],
+    seen: Set[Tuple[str, Any, Any]],
+) -> List[Dict[str, Any]]:
+    """Load and return the definitions of all the bases of a device."""
+    bases = []
+    for base_spec in device_dict.get("bases", ()):
+        key = _get_base_key(base_spec, resource_dict)
+        if key not in seen:
+            seen.add(key)
+            name, filename, bundled = key
+            base_dict = loader.get_device_dict(
+                name, filename, bundled, SPEC_VERSION_TUPLE[0]
+            )
+            bases.append(base_dict)
+            bases.extend(
+                _load_bases(
+                    base_dict, loader, {"filename": filename, "bundled": bundled}, seen
+                )
+            )
+    return bases
@@ -24,12 +24,11 @@ class SerialInstrumentSession(session.MessageBasedSession):
         )
 
     def write(self, data: bytes) -> Tuple[int, constants.StatusCode]:
-        send_end, _ = self.get_attribute(constants.ResourceAttribute.send_end_enabled)
-        asrl_end, _ = self.get_attribute(constants.ResourceAttribute.asrl_end_out)
-        data_bits, _ = self.get_attribute(constants.ResourceAttribute.asrl_data_bits)
-
-        end_char, _ = self.get_attribute(constants.ResourceAttribute.termchar)
-        end_char = common.int_to_byte(end_char)
+        config = self.io_config
+        send_end = config.send_end
+        asrl_end = config.asrl_end_out
+        data_bits = config.data_bits
+        end_char = common.int_to_byte(config.termchar)
 
         len_transferred = len(data)
 
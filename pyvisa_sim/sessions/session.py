@@ -6,13 +6,27 @@
 
 """
 
+import importlib
 import time
-from typing import Any, Callable, Dict, Optional, Tuple, Type, TypeVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    FrozenSet,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 from pyvisa import attributes, constants, rname, typing
 
 from ..common import int_to_byte, logger
-from ..devices import Device
+
+if TYPE_CHECKING:
+    from ..devices import Device
 
 S = TypeVar("S", bound="Session")
 
@@ -37,11 +51,15 @@ class Session:
     #: dict[(Interface Type, Resource Class) , Session]
     _session_classes: Dict[Tuple[constants.InterfaceType, str], Type["Session"]] = {}
 
+    #: Maps (Interface Type, Resource Class) to the module registering the session
+    #: class when imported.
+    _session_modules: Dict[Tuple[constants.InterfaceType, str], str] = {}
+
     #: Session handler for the resource manager.
     session_type: Tuple[constants.InterfaceType, str]
 
     #: Simulated device access by this session
-    device: Device
+    device: "Device"
 
     @classmethod
     def get_session_class(
@@ -62,6 +80,10 @@ class Session:
             Registered session class.
 
         """
+        key = (interface_type, resource_class)
+        if key not in cls._session_classes and key in cls._session_modules:
+            importlib.import_module(cls._session_modules[key])
+
         try:
             return cls._session_classes[(interface_type, resource_class)]
         except KeyError:
@@ -98,6 +120,27 @@ class Session:
 
         return _internal
 
+    @classmethod
+    def register_module(
+        cls, interface_type: constants.InterfaceType, resource_class: str, module: str
+    ) -> None:
+        """Register the module defining the session class of a resource type.
+
+        The module is only imported when the session class is first needed and
+        must register the class using Session.register.
+
+        Parameters
+        ----------
+        interface_type : constants.InterfaceType
+            Type of the interface the session class is used for.
+        resource_class : str
+            Resource class the session class is used for.
+        module : str
+            Absolute name of the module.
+
+        """
+        cls._session_modules[(interface_type, resource_class)] = module
+
     def __init__(
         self,
         resource_manager_session: typing.VISARMSession,
@@ -113,6 +156,7 @@ class Session:
             constants.ResourceAttribute.resource_class: parsed.resource_class,
             constants.ResourceAttribute.interface_type: parsed.interface_type_const,
         }
+        self._io_config = None
         self.after_parsing()
 
     def after_parsing(self) -> None:
@@ -201,49 +245,155 @@ class Session:
         except ValueError:
             return constants.StatusCode.error_nonsupported_attribute_state
 
+        if attribute in IOConfig.attributes:
+            self._io_config = None
+
         return constants.StatusCode.success
 
+    @property
+    def io_config(self) -> "IOConfig":
+        """Read and write configuration derived from the session attributes."""
+        if self._io_config is None:
+            self._io_config = IOConfig(self)
+        return self._io_config
 
-class MessageBasedSession(Session):
-    """Base class for Message-Based sessions that support ``read`` and ``write`` methods."""
+    # --- Private API
 
-    def read(self, count: int) -> Tuple[bytes, constants.StatusCode]:
-        timeout, _ = self.get_attribute(constants.ResourceAttribute.timeout_value)
-        timeout /= 1000
+    #: Cached read and write configuration, None if it needs to be rebuilt.
+    _io_config: Optional["IOConfig"]
 
-        suppress_end_enabled, _ = self.get_attribute(
-            constants.ResourceAttribute.suppress_end_enabled
-        )
-        termchar, _ = self.get_attribute(constants.ResourceAttribute.termchar)
-        termchar = int_to_byte(termchar)
-        termchar_enabled, _ = self.get_attribute(
-            constants.ResourceAttribute.termchar_enabled
-        )
 
-        interface_type, _ = self.get_attribute(
-            constants.ResourceAttribute.interface_type
+class IOConfig:
+    """Snapshot of the session attributes used when reading and writing.
+
+    Built on first use from the session attributes, and discarded by
+    :meth:`Session.set_attribute` when one of the attributes it depends on is
+    altered.
+
+    Parameters
+    ----------
+    session : Session
+        Session whose attributes should be captured.
+
+    """
+
+    #: Attributes the configuration depends on.
+    attributes: ClassVar[FrozenSet[constants.ResourceAttribute]] = frozenset(
+        (
+            constants.ResourceAttribute.timeout_value,
+            constants.ResourceAttribute.termchar,
+            constants.ResourceAttribute.termchar_enabled,
+            constants.ResourceAttribute.suppress_end_enabled,
+            constants.ResourceAttribute.send_end_enabled,
+            constants.ResourceAttribute.asrl_end_in,
+            constants.ResourceAttribute.asrl_end_out,
+            constants.ResourceAttribute.asrl_data_bits,
         )
-        is_asrl = interface_type == constants.InterfaceType.asrl
-        if is_asrl:
-            asrl_end_in, _ = self.get_attribute(constants.ResourceAttribute.asrl_end_in)
-            asrl_last_bit, _ = self.get_attribute(
-                constants.ResourceAttribute.asrl_data_bits
-            )
-            if asrl_last_bit:
-                asrl_last_bit_mask = 1 << (asrl_last_bit - 1)
+    )
+
+    #: Timeout in seconds.
+    timeout: float
+
+    #: Termination character.
+    termchar: int
+
+    #: Whether reads end on the termination character.
+    termchar_enabled: bool
+
+    #: Whether the END indicator is ignored when reading.
+    suppress_end_enabled: bool
+
+    #: Whether the END indicator should be sent on the last written byte.
+    send_end: bool
+
+    #: Whether the session is a serial one, in which case the asrl attributes apply.
+    is_asrl: bool
+
+    #: Method used to terminate read operations on serial sessions.
+    asrl_end_in: Optional[constants.SerialTermination]
+
+    #: Method used to terminate write operations on serial sessions.
+    asrl_end_out: Optional[constants.SerialTermination]
+
+    #: Number of data bits per serial frame.
+    data_bits: Optional[int]
+
+    #: Mask of the last data bit when it is used as END indicator, zero otherwise.
+    last_bit_mask: int
+
+    #: Bytes at which a read chunk must end so that termination rules can be
+    #: checked on its last byte.
+    stop_bytes: bytes
+
+    def __init__(self, session: Session) -> None:
+        attr = constants.ResourceAttribute
+        timeout, _ = session.get_attribute(attr.timeout_value)
+        self.timeout = timeout / 1000
+        self.termchar, _ = session.get_attribute(attr.termchar)
+        self.termchar_enabled, _ = session.get_attribute(attr.termchar_enabled)
+        self.suppress_end_enabled, _ = session.get_attribute(attr.suppress_end_enabled)
+        self.send_end, _ = session.get_attribute(attr.send_end_enabled)
+
+        interface_type, _ = session.get_attribute(attr.interface_type)
+        self.is_asrl = interface_type == constants.InterfaceType.asrl
+        self.asrl_end_in = self.asrl_end_out = self.data_bits = None
+        self.last_bit_mask = 0
+        if self.is_asrl:
+            self.asrl_end_in, _ = session.get_attribute(attr.asrl_end_in)
+            self.asrl_end_out, _ = session.get_attribute(attr.asrl_end_out)
+            self.data_bits, _ = session.get_attribute(attr.asrl_data_bits)
+            if self.data_bits:
+                self.last_bit_mask = 1 << (self.data_bits - 1)
+
+        stop_bytes = b""
+        if self.termchar_enabled or (
+            self.asrl_end_in == constants.SerialTermination.termination_char
+        ):
+            stop_bytes += int_to_byte(self.termchar)
+        if (
+            self.asrl_end_in == constants.SerialTermination.last_bit
+            and self.last_bit_mask
+        ):
+            stop_bytes += bytes(b for b in range(256) if b & self.last_bit_mask)
+        self.stop_bytes = stop_bytes
+
+
+class MessageBasedSession(Session):
+    """Base class for Message-Based sessions that support ``read`` and ``write`` methods."""
+
+    def read(self, count: int) -> Tuple[bytes, constants.StatusCode]:
+        config = self.io_config
+        timeout = config.timeout
+        termchar = config.termchar
+        termchar_enabled = config.termchar_enabled
+        suppress_end_enabled = config.suppress_end_enabled
+        is_asrl = config.is_asrl
+        asrl_end_in = config.asrl_end_in
 
         start = time.monotonic()
 
         out = bytearray()
 
+        # Nothing can be read, do not mistake the empty chunk for an empty buffer.
+        if count <= 0:
+            return b"", constants.StatusCode.success_max_count_read
+
         while time.monotonic() - start <= timeout:
-            last, end_indicator = self.device.read()
+            chunk, end_indicator = self.device.read(count - len(out), config.stop_bytes)
+
+            # Block until the device queues a response if its output buffer
+            # was empty.
+            if not chunk:
+                self.device.wait_for_output(timeout - (time.monotonic() - start))
+                continue
 
-            out += last
+            out += chunk
 
             # N.B.: References here are to VPP-4.3 rev. 7.2.1
             # (https://www.ivifoundation.org/downloads/VISA/vpp43_2024-01-04.pdf).
+            # Only the last byte of the chunk can meet a termination condition.
 
+            last = chunk[-1]
             is_termchar = last == termchar
 
             if is_asrl:
@@ -256,7 +406,7 @@ class MessageBasedSession(Session):
                     and is_termchar
                 ) or (
                     asrl_end_in == constants.SerialTermination.last_bit
-                    and out[-1] & asrl_last_bit_mask
+                    and last & config.last_bit_mask
                 ):
                     # Rule 6.1.7.
                     end_indicator = True
@@ -271,14 +421,10 @@ class MessageBasedSession(Session):
                 # Rule 6.1.3.
                 return out, constants.StatusCode.success_max_count_read
 
-            # Busy-wait only if the device's output buffer was empty.
-            if not last:
-                time.sleep(0.01)
-        else:
-            return out, constants.StatusCode.error_timeout
+        return out, constants.StatusCode.error_timeout
 
     def write(self, data: bytes) -> Tuple[int, constants.StatusCode]:
-        send_end = self.get_attribute(constants.ResourceAttribute.send_end_enabled)
+        send_end = self.io_config.send_end
 
         self.device.write(data)
 
@@ -1,8 +1,22 @@
+import importlib.resources
 import os
+import re
 
 import pytest
 
 import pyvisa
+from pyvisa_sim import cache
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cache_dir(tmp_path_factory):
+    """Keep the compiled definitions out of the user cache directory."""
+    mp = pytest.MonkeyPatch()
+    path = tmp_path_factory.mktemp("cache")
+    mp.setenv("PYVISA_SIM_CACHE_DIR", str(path))
+    yield path
+    cache.flush()
+    mp.undo()
 
 
 @pytest.fixture(scope="session")
@@ -18,3 +32,43 @@ def channels():
     rm = pyvisa.ResourceManager(path + "@sim")
     yield rm
     rm.close()
+
+
+def _default_with(tmp_path, name, key):
+    """Resource manager using the default definitions with key added to devices."""
+    content = (
+        importlib.resources.files("pyvisa_sim").joinpath("default.yaml").read_text()
+    )
+    content = re.sub(r"^(  device \d+:)$", r"\1\n    " + key, content, flags=re.M)
+    path = tmp_path / name
+    path.write_text(content)
+    return pyvisa.ResourceManager(str(path) + "@sim")
+
+
+@pytest.fixture
+def regex_setters_resource_manager(tmp_path):
+    rm = _default_with(tmp_path, "regex_setters.yaml", "setter_engine: regex")
+    yield rm
+    rm.close()
+
+
+@pytest.fixture
+def lazy_resource_manager(tmp_path):
+    rm = _default_with(tmp_path, "lazy.yaml", "lazy: true")
+    yield rm
+    rm.close()
+
+
+@pytest.fixture
+def artifact_resource_manager(tmp_path):
+    """Resource manager using the default definitions compiled into an artifact."""
+    from pyvisa_sim import cli
+
+    source = tmp_path / "default.yaml"
+    source.write_text(
+        importlib.resources.files("pyvisa_sim").joinpath("default.yaml").read_text()
+    )
+    assert cli.main(["compile", str(source)]) == 0
+    rm = pyvisa.ResourceManager(str(tmp_path / "default.simlab") + "@sim")
+    yield rm
+    rm.close()
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 import logging
 import random
+import threading
+import time
 
 import pytest
 
+import pyvisa
+from pyvisa import constants
 from pyvisa.errors import VisaIOError
 
 # We must fix the seed in order to have reproducible random numbers when testing RANDOM functionality!
@@ -53,7 +57,17 @@ def test_list(resource_manager):
         "USB0::0x1111::0x2222::0x4445::0::RAW",
     ],
 )
-def test_instruments(resource, resource_manager):
+@pytest.mark.parametrize(
+    "manager",
+    [
+        "resource_manager",
+        "regex_setters_resource_manager",
+        "lazy_resource_manager",
+        "artifact_resource_manager",
+    ],
+)
+def test_instruments(resource, manager, request):
+    resource_manager = request.getfixturevalue(manager)
     inst = resource_manager.open_resource(
         resource,
         read_termination="\n",
@@ -240,3 +254,146 @@ def test_multiple_outputs(resource, resource_manager):
         assert_instrument_response(inst, ":BAD:SCAN:INSIDE?", "")
 
     inst.close()
+
+
+@pytest.mark.parametrize(
+    "resource",
+    [
+        "ASRL1::INSTR",
+        "GPIB0::8::INSTR",
+        "TCPIP0::localhost::inst0::INSTR",
+        "USB0::0x1111::0x2222::0x1234::0::INSTR",
+    ],
+)
+def test_read_in_chunks(resource, resource_manager):
+    inst = resource_manager.open_resource(
+        resource,
+        read_termination="\n",
+        write_termination="\r\n" if resource.startswith("ASRL") else "\n",
+    )
+
+    inst.write("?IDN")
+    assert inst.read_bytes(4) == b"LSG "
+    assert inst.read_bytes(7) == b"Serial "
+    assert inst.read() == "#1234"
+
+    inst.write("?IDN")
+    assert inst.read_bytes(100, break_on_termchar=True) == b"LSG Serial #1234\n"
+
+    inst.close()
+
+
+def test_read_zero_bytes(resource_manager):
+    inst = resource_manager.open_resource(
+        "ASRL1::INSTR", read_termination="\n", write_termination="\r\n", timeout=500
+    )
+
+    inst.write("?IDN")
+    start = time.monotonic()
+    data, status = resource_manager.visalib.read(inst.session, 0)
+    assert (data, status) == (b"", constants.StatusCode.success_max_count_read)
+    assert time.monotonic() - start < 0.25
+    assert inst.read() == "LSG Serial #1234"
+
+    inst.close()
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_read_wakes_up_on_delayed_response(
+    resource_manager, lazy_resource_manager, lazy
+):
+    rm = lazy_resource_manager if lazy else resource_manager
+    inst = rm.open_resource(
+        "GPIB0::8::INSTR", read_termination="\n", write_termination="\n", timeout=5000
+    )
+
+    timer = threading.Timer(0.05, inst.write, ("?IDN",))
+    start = time.monotonic()
+    timer.start()
+    assert inst.read() == "LSG Serial #1234"
+    assert time.monotonic() - start < 2
+    timer.join()
+
+    inst.close()
+
+
+def test_io_config_follows_attributes(resource_manager):
+    inst = resource_manager.open_resource("GPIB0::8::INSTR", timeout=1000)
+    session = resource_manager.visalib.sessions[inst.session]
+
+    config = session.io_config
+    assert config.timeout == 1.0
+    assert session.io_config is config
+
+    # Attributes unrelated to I/O do not invalidate the configuration.
+    inst.set_visa_attribute(pyvisa.constants.ResourceAttribute.dma_allow_enabled, 1)
+    assert session.io_config is config
+
+    inst.timeout = 2500
+    assert session.io_config is not config
+    assert session.io_config.timeout == 2.5
+
+    inst.close()
+
+
+RELOAD_DEFINITION = """
+spec: "1.1"
+devices:
+  device 1:
+    eom:
+      GPIB INSTR:
+        q: "\\n"
+        r: "\\n"
+    dialogues:
+      - q: "*IDN?"
+        r: "%s"
+    properties:
+      volt:
+        default: 1.0
+        getter:
+          q: "VOLT?"
+          r: "{:.1f}"
+        setter:
+          q: "VOLT {:.1f}"
+        specs:
+          type: float
+resources:
+  GPIB0::1::INSTR:
+    device: device 1
+  GPIB0::2::INSTR:
+    device: %s
+"""
+
+
+def test_reload(tmp_path):
+    path = tmp_path / "reload.yaml"
+    path.write_text(RELOAD_DEFINITION % ("DEV 1", "device 1"))
+    rm = pyvisa.ResourceManager(str(path) + "@sim")
+    first = rm.open_resource(
+        "GPIB0::1::INSTR", read_termination="\n", write_termination="\n"
+    )
+    first.write("VOLT 2.0")
+    assert rm.visalib.reload() == []
+
+    # Both resources use a modified device.
+    path.write_text(RELOAD_DEFINITION % ("DEVICE 1", "device 1"))
+    assert rm.visalib.reload() == ["GPIB0::1::INSTR", "GPIB0::2::INSTR"]
+    assert first.query("*IDN?") == "DEVICE 1"
+    assert first.query("VOLT?") == "1.0"
+    first.write("VOLT 2.0")
+
+    # Only the second resource changes.
+    path.write_text(
+        RELOAD_DEFINITION.replace(
+            "resources:", "  device 2:\n    bases: [device 1]\nresources:"
+        )
+        % ("DEVICE 1", "device 2")
+    )
+    assert rm.visalib.reload() == ["GPIB0::2::INSTR"]
+    assert first.query("VOLT?") == "2.0"
+    second = rm.open_resource(
+        "GPIB0::2::INSTR", read_termination="\n", write_termination="\n"
+    )
+    assert second.query("*IDN?") == "DEVICE 1"
+
+    rm.close()
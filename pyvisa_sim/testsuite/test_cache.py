@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+from pyvisa_sim import cache, parser
+from pyvisa_sim.component import NoResponse
+
+MAIN = """
+spec: "1.1"
+resources:
+  GPIB0::1::INSTR:
+    device: dev
+    filename: sub.yaml
+"""
+
+SUB = """
+spec: "1.1"
+devices:
+  dev:
+    dialogues:
+      - q: "*IDN?"
+        r: "%s"
+    properties:
+      volt:
+        default: 1.0
+        getter:
+          q: "VOLT?"
+          r: "{:.1f}"
+        setter:
+          q: "VOLT {:.1f}"
+        specs:
+          type: float
+"""
+
+
+@pytest.fixture
+def definitions(tmp_path):
+    (tmp_path / "sub.yaml").write_text(SUB % "DEV 1")
+    path = tmp_path / "main.yaml"
+    path.write_text(MAIN)
+    return path
+
+
+def test_definitions_are_shared_in_process(definitions, monkeypatch) -> None:
+    devices = parser.get_devices(definitions, False)
+    with monkeypatch.context() as m:
+        m.setattr(parser, "parse_file", None)
+        other = parser.get_devices(definitions, False)
+
+    first, second = devices["GPIB0::1::INSTR"], other["GPIB0::1::INSTR"]
+    assert first is not second
+    assert first._dispatch is second._dispatch
+    assert first._match(b"VOLT 2.0") is NoResponse
+    assert second._match(b"VOLT?") == b"1.0"
+
+    # Changing a referenced file invalidates the definitions.
+    (definitions.parent / "sub.yaml").write_text(SUB % "DEV 10")
+    devices = parser.get_devices(definitions, False)
+    assert devices["GPIB0::1::INSTR"]._match(b"*IDN?") == b"DEV 10"
+
+
+def test_devices_are_cached(definitions, cache_dir, monkeypatch) -> None:
+    devices = parser.get_devices(definitions, False)
+    assert devices["GPIB0::1::INSTR"]._match(b"*IDN?") == b"DEV 1"
+    entry = cache_dir / cache._entry_name(definitions, False)
+    assert entry.exists()
+
+    cache.clear_registry()
+    with monkeypatch.context() as m:
+        m.setattr(parser, "parse_file", None)
+        cached = parser.get_devices(definitions, False)
+    device = cached["GPIB0::1::INSTR"]
+    assert device._match(b"*IDN?") == b"DEV 1"
+    assert device._match(b"VOLT 2.0") is NoResponse
+    assert device._match(b"VOLT?") == b"2.0"
+
+    # Changing a referenced file invalidates the entry.
+    cache.clear_registry()
+    (definitions.parent / "sub.yaml").write_text(SUB % "DEV 2")
+    devices = parser.get_devices(definitions, False)
+    assert devices["GPIB0::1::INSTR"]._match(b"*IDN?") == b"DEV 2"
+
+
+def test_built_devices_are_cached(definitions, monkeypatch) -> None:
+    devices = parser.get_devices(definitions, False)
+    devices["GPIB0::1::INSTR"]
+    cache.flush()
+
+    cache.clear_registry()
+    with monkeypatch.context() as m:
+        m.setattr(parser, "parse_file", None)
+        m.setattr(parser, "get_device", None)
+        cached = parser.get_devices(definitions, False)
+    assert cached["GPIB0::1::INSTR"]._match(b"*IDN?") == b"DEV 1"
+
+
+def test_entries_are_replaced(definitions, cache_dir) -> None:
+    parser.get_devices(definitions, False)
+    count = len(list(cache_dir.glob("*.pickle")))
+    for i in range(3):
+        (definitions.parent / "sub.yaml").write_text(SUB % ("DEV %d" % (i + 2)))
+        devices = parser.get_devices(definitions, False)
+        assert devices["GPIB0::1::INSTR"]._match(b"*IDN?") == b"DEV %d" % (i + 2)
+        cache.flush()
+    assert len(list(cache_dir.glob("*.pickle"))) == count
+
+
+def test_cache_can_be_disabled(definitions, monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, "")
+    assert cache.get_cache_dir() is None
+    parser.get_devices(definitions, False)
+    assert not list(tmp_path.glob("*.pickle"))
+
+
+def test_outdated_entry_is_not_unpickled(definitions, monkeypatch) -> None:
+    parser.get_devices(definitions, False)
+    cache.clear_registry()
+    (definitions.parent / "sub.yaml").write_text(SUB % "DEV 2")
+
+    loaded = []
+
+    def load(fp):
+        loaded.append(fp)
+        return pickle.load(fp)
+
+    with monkeypatch.context() as m:
+        m.setattr(cache, "pickle", SimpleNamespace(load=load, dumps=pickle.dumps))
+        devices = parser.get_devices(definitions, False)
+    assert devices["GPIB0::1::INSTR"]._match(b"*IDN?") == b"DEV 2"
+    assert not loaded
+
+
+def test_corrupted_entry_is_ignored(definitions, cache_dir) -> None:
+    parser.get_devices(definitions, False)
+    (cache_dir / cache._entry_name(definitions, False)).write_bytes(b"garbage")
+    cache.clear_registry()
+    devices = parser.get_devices(definitions, False)
+    assert devices["GPIB0::1::INSTR"]._match(b"*IDN?") == b"DEV 1"
+
+
+def test_no_response_survives_pickling() -> None:
+    assert pickle.loads(pickle.dumps(NoResponse)) is NoResponse
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 import pytest
 
+from pyvisa_sim.channels import Channels
+from pyvisa_sim.devices import Device
+
 
 def assert_instrument_response(device, query, data):
     response = device.query(query)
@@ -54,3 +57,23 @@ def test_instrument_with_inline_selection(resource, channels):
     inst.write("CH 1:VOLT:IMM:AMPL 2.0")
     assert_instrument_response(inst, "CH 1:VOLT:IMM:AMPL?", "+2.00000000E+00")
     assert_instrument_response(inst, "CH 2:VOLT:IMM:AMPL?", "+1.00000000E+00")
+
+
+def test_channel_tables_are_built_once():
+    device = Device("dev", b";")
+    channels = Channels(device, ["1", "2"], True)
+    channels.add_dialogue("CH{ch_id}:IDN?", "CHANNEL")
+    channels.add_property(
+        "volt", "1.0", ("CH{ch_id}:VOLT?", "{:.1f}"), None, {"type": "float"}
+    )
+
+    assert channels._dialogues["2"] is channels._dialogues["2"]
+    assert channels.match(b"CH2:IDN?") == b"CHANNEL"
+    assert channels._selected == "2"
+    assert channels.match(b"CH1:VOLT?") == b"1.0"
+    assert channels._selected == "1"
+    assert channels.match(b"CH3:VOLT?") is None
+
+    # Adding a definition discards the specialized tables.
+    channels.add_dialogue("CH{ch_id}:NAME?", "NAME")
+    assert channels.match(b"CH1:NAME?") == b"NAME"
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import importlib.resources
+import pickle
+
+import pytest
+
+import pyvisa
+from pyvisa_sim import artifact, cli, parser
+from pyvisa_sim.component import NoResponse
+from pyvisa_sim.highlevel import SimVisaLibrary
+
+DEFINITION = """
+spec: "1.1"
+devices:
+  dev:
+    dialogues:
+      - q: "*IDN?"
+        r: "DEV"
+    properties:
+      volt:
+        default: 1.0
+        getter:
+          q: "VOLT?"
+          r: "{:.1f}"
+        setter:
+          q: "VOLT {:.1f}"
+        specs:
+          type: float
+resources:
+  GPIB0::{1..2}::INSTR:
+    device: dev
+"""
+
+INVALID_DEFINITION = """
+spec: "1.1"
+devices:
+  dev:
+    dialogues:
+      - q: "*IDN?"
+        r: "DEV"
+      - r: "OK"
+resources:
+  GPIB0::1::INSTR:
+    device: dev
+"""
+
+
+def test_compile(tmp_path, monkeypatch, capsys) -> None:
+    source = tmp_path / "lab.yaml"
+    source.write_text(DEFINITION)
+    assert cli.main(["compile", str(source)]) == 0
+    output = tmp_path / "lab.simlab"
+    assert "2 resources" in capsys.readouterr().out
+    assert artifact.is_artifact(output)
+    assert not artifact.is_artifact(source)
+
+    # The artifact is used without parsing any definition file.
+    source.unlink()
+    monkeypatch.setattr(parser, "parse_file", None)
+    devices = parser.get_devices(output, False)
+    assert devices.list_resources() == ("GPIB0::1::INSTR", "GPIB0::2::INSTR")
+    first, second = devices["GPIB0::1::INSTR"], devices["GPIB0::2::INSTR"]
+    assert first._match(b"VOLT 2.0") is NoResponse
+    assert first._match(b"VOLT?") == b"2.0"
+    assert second._match(b"VOLT?") == b"1.0"
+
+
+def test_compile_reports_invalid_devices(tmp_path, capsys) -> None:
+    source = tmp_path / "lab.yaml"
+    source.write_text(INVALID_DEFINITION)
+    assert cli.main(["compile", str(source), "-o", str(tmp_path / "out")]) == 1
+    err = capsys.readouterr().err
+    assert "GPIB0::1::INSTR" in err and "malformed dialogue" in err
+    assert not (tmp_path / "out").exists()
+
+
+def test_compile_reports_unpicklable_setters(tmp_path, capsys) -> None:
+    source = tmp_path / "lab.yaml"
+    source.write_text(DEFINITION)
+    output = tmp_path / "lab.simlab"
+    cli.compile_definitions(source, output)
+    content = output.read_bytes()
+
+    # Setters using the % format are parsed by a lambda which cannot be pickled.
+    source.write_text(DEFINITION.replace("VOLT {:.1f}", "VOLT {:%}"))
+    assert cli.main(["compile", str(source)]) == 1
+    err = capsys.readouterr().err
+    assert "setter 'VOLT {:%}' of property volt of resource GPIB0::1::INSTR" in err
+    assert output.read_bytes() == content
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["lab.simlab", "lab.yaml"]
+
+
+def test_artifact_from_other_version_is_rejected(tmp_path) -> None:
+    source = tmp_path / "lab.yaml"
+    source.write_text(DEFINITION)
+    output = tmp_path / "lab.simlab"
+    cli.compile_definitions(source, output)
+
+    header = artifact._header(source)
+    header["version"] = "0.0"
+    with open(output, "wb") as fp:
+        fp.write(artifact.MAGIC)
+        pickle.dump(header, fp)
+    with pytest.raises(ValueError, match=r"compile .*lab\.yaml again"):
+        artifact.read_artifact(output)
+
+
+@pytest.mark.parametrize("fmt", ["json", "toml"])
+def test_convert(tmp_path, fmt) -> None:
+    source = tmp_path / "default.yaml"
+    source.write_text(
+        importlib.resources.files("pyvisa_sim").joinpath("default.yaml").read_text()
+    )
+    assert cli.main(["convert", str(source), "-f", fmt]) == 0
+    output = tmp_path / ("default." + fmt)
+    assert parser.parse_file(output) == parser.parse_file(source)
+
+    devices = parser.get_devices(output, False)
+    device = devices["GPIB0::8::INSTR"]
+    assert device._match(b"?IDN") == b"LSG Serial #1234"
+
+
+def test_convert_requires_known_format(tmp_path, capsys) -> None:
+    source = tmp_path / "lab.yaml"
+    source.write_text(DEFINITION)
+    assert cli.main(["convert", str(source), "-o", str(tmp_path / "lab.yml")]) == 1
+    assert "supported extensions" in capsys.readouterr().err
+
+
+def test_reload_artifact(tmp_path, monkeypatch) -> None:
+    source = tmp_path / "lab.yaml"
+    source.write_text(DEFINITION)
+    output = tmp_path / "lab.simlab"
+    cli.compile_definitions(source, output)
+    rm = pyvisa.ResourceManager(str(output) + "@sim")
+    assert isinstance(rm.visalib, SimVisaLibrary)
+
+    # An unchanged artifact is not read again.
+    with monkeypatch.context() as m:
+        m.setattr(artifact, "read_artifact", None)
+        assert rm.visalib.reload() == []
+
+    source.write_text(DEFINITION.replace('r: "DEV"', 'r: "DEV 2"'))
+    cli.compile_definitions(source, output)
+    assert rm.visalib.reload() == ["GPIB0::1::INSTR", "GPIB0::2::INSTR"]
+    rm.close()
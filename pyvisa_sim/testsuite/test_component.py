@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+import stringparser
+
+from pyvisa_sim import component
+from pyvisa_sim.component import (
+    Component,
+    DialogueHandler,
+    NoResponse,
+    RandomHandler,
+    RandomResponse,
+    RegexSetterTable,
+    SetterTable,
+    dialogue_handler,
+    literal_prefix,
+)
+
+
+@pytest.mark.parametrize(
+    "format_string, want",
+    [
+        ("!FREQ {:.2f}", "!FREQ "),
+        ("VOLT:{}", "VOLT:"),
+        ("{:d}", ""),
+        ("CH {ch_id:d}:VOLT {:f}", "CH "),
+        ("*RST", "*RST"),
+        ("A{{B}} {:d}", "A{B} "),
+    ],
+)
+def test_literal_prefix(format_string, want):
+    assert literal_prefix(format_string) == want
+
+
+def test_setter_table_candidates():
+    table = SetterTable()
+    for i, query in enumerate(["!FREQ {:f}", "{:d}", "!FR{}", "!AMP {:f}"]):
+        table.append(query, (str(i), None, b"", b""))  # type: ignore[arg-type]
+
+    assert len(table) == 4
+    assert [s[0] for s in table.candidates("!FREQ 1.0")] == ["0", "1", "2"]
+    assert [s[0] for s in table.candidates("!AMP 1.0")] == ["1", "3"]
+    assert [s[0] for s in table.candidates("12")] == ["1"]
+
+
+def test_regex_setter_table_matches_parser_table():
+    formats = [
+        "!FREQ {:.2f}",
+        "!AMP {:.2f}",
+        "CH {ch_id:d}:VOLT {:+.8E}",
+        "{0:d},{1:d}",
+        "MODE {}",
+        "!FREQ {:d}",
+        "X{a[b]:d}",
+        "*RST",
+    ]
+    tables = SetterTable(), RegexSetterTable()
+    for i, query in enumerate(formats):
+        for table in tables:
+            table.append(query, (str(i), stringparser.Parser(query), b"", b""))
+
+    for query in [
+        "!FREQ 10.30",
+        "!FREQ 10",
+        "CH 2:VOLT +2.00000000E+00",
+        "1,2",
+        "MODE abc",
+        "X5",
+        "*RST",
+        "nope",
+    ]:
+        expected = [(s[0], v) for s, v in tables[0].parse(query)]
+        assert [(s[0], v) for s, v in tables[1].parse(query)] == expected
+
+
+def test_setter_engine_selection():
+    component = Component()
+    component.add_property("freq", "1.0", None, ("!FREQ {:.2f}", "OK", "ERR"), {})
+    assert component.setter_engine == "parser"
+
+    component.set_setter_engine("regex")
+    assert component.setter_engine == "regex"
+    assert component._match_setters(b"!FREQ 2.00") == b"OK"
+    assert component._properties["freq"].get_value() == 2.0
+
+    with pytest.raises(ValueError):
+        component.set_setter_engine("bogus")
+
+
+def test_random_response_is_parsed_once():
+    generator = RandomResponse("{RANDOM(0, 10.5, 3):.2f}")
+    assert generator.valid
+    assert (generator.min, generator.max, generator.count) == (0.0, 10.5, 3)
+    assert generator.format == "{:.2f}"
+
+    values = generator().split(", ")
+    assert len(values) == 3
+    assert all(0 <= float(v) <= 10.5 for v in values)
+
+
+@pytest.mark.parametrize(
+    "template", ["RANDOM(0, 10.5, 5){:.2f}", "{RANDOM(0, 10.5):.2f}"]
+)
+def test_invalid_random_response_raises_when_generating(template):
+    generator = RandomResponse(template)
+    assert not generator.valid
+    with pytest.raises(Exception):
+        generator()
+
+
+def test_dialogue_handler_selection():
+    assert isinstance(dialogue_handler("ON"), DialogueHandler)
+    assert isinstance(dialogue_handler("{RANDOM(0, 1, 1):.2f}"), RandomHandler)
+    assert dialogue_handler(NoResponse)(Component()) is NoResponse
+
+
+def test_random_response_with_dedicated_generator():
+    generator = RandomResponse("{RANDOM(0, 1, 5):.4f}")
+    assert generator(random.Random(1)) == generator(random.Random(1))
+
+    component = Component()
+    component.set_random_seed(3)
+    first = RandomHandler("dialogue", generator)(component)
+    component.set_random_seed(3)
+    assert RandomHandler("dialogue", generator)(component) == first
+
+
+def test_random_response_large_count():
+    generator = RandomResponse("{RANDOM(-1, 1, 5000):.3f}")
+    values = generator(random.Random(0)).split(", ")
+    assert len(values) == 5000
+    assert all(-1 <= float(v) <= 1 for v in values)
+    assert generator(random.Random(0)) == generator(random.Random(0))
+
+
+def test_random_response_does_not_depend_on_numpy(monkeypatch):
+    pytest.importorskip("numpy")
+    generator = RandomResponse("{RANDOM(-1, 1, 5000):.3f}")
+    rng = random.Random(0)
+    responses = [generator(rng), generator(rng)]
+    state = rng.getstate()
+
+    monkeypatch.setattr(component, "_numpy", lambda: None)
+    rng = random.Random(0)
+    assert [generator(rng), generator(rng)] == responses
+    assert rng.getstate() == state
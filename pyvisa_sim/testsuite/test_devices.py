@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+from pyvisa_sim.component import NoResponse
+from pyvisa_sim.devices import Device, OutputBuffer
+
+
+def test_output_buffer_read():
+    buffer = OutputBuffer()
+    assert not buffer
+    assert buffer.read(10) == (b"", False)
+
+    buffer.append(b"abcdef\n")
+    buffer.append(b"gh\n")
+    assert len(buffer) == 10
+
+    assert buffer.read(2) == (b"ab", False)
+    assert buffer.read(2) == (b"cd", False)
+    assert buffer.read(10) == (b"ef\n", True)
+    assert len(buffer) == 3
+    assert buffer.read(10) == (b"gh\n", True)
+    assert not buffer
+
+
+def test_output_buffer_read_until():
+    buffer = OutputBuffer()
+    buffer.append(b"a,b;c\n")
+
+    assert buffer.read_until(b",", 10) == (b"a,", False)
+    assert buffer.read_until(b";,", 1) == (b"b", False)
+    assert buffer.read_until(b";,", 10) == (b";", False)
+    assert buffer.read_until(b"\n", 10) == (b"c\n", True)
+
+
+def test_output_buffer_returns_whole_response_without_copy():
+    buffer = OutputBuffer()
+    response = b"x" * 1000 + b"\n"
+    buffer.append(response)
+
+    chunk, end = buffer.read(len(response))
+    assert chunk is response
+    assert end
+
+
+def test_output_buffer_wait():
+    buffer = OutputBuffer()
+    assert not buffer.wait(0.01)
+
+    timer = threading.Timer(0.05, buffer.append, (b"late\n",))
+    start = time.monotonic()
+    timer.start()
+    assert buffer.wait(5)
+    assert time.monotonic() - start < 2
+    assert buffer.read(10) == (b"late\n", True)
+
+
+def test_device_dispatch_table():
+    device = Device("dev", b";")
+    device.add_dialogue("*IDN?", "DEV")
+    device.add_property("volt", "1.0", ("VOLT?", "{:.1f}"), None, {"type": "float"})
+    device.add_error_handler(
+        {"status_register": [{"q": "*ESR?", "command_error": "32"}]}
+    )
+
+    assert device._match(b"*IDN?") == b"DEV"
+    assert device._match(b"VOLT?") == b"1.0"
+    assert device._match(b"*ESR?") == b"0"
+    assert device._match(b"BOGUS") is None
+
+    # Adding a definition invalidates the compiled table.
+    device.add_dialogue("*OPC?", "1")
+    assert device._match(b"*OPC?") == b"1"
+
+
+def test_device_dispatch_table_conflict(caplog):
+    device = Device("dev", b";")
+    device.add_dialogue("VOLT?", "1")
+    device.add_property("volt", "1.0", ("VOLT?", "{:.1f}"), None, {"type": "float"})
+
+    with caplog.at_level("WARNING"):
+        device.compile()
+    assert "dialogue" in caplog.text and "getter" in caplog.text
+
+    # The dialogue takes precedence as when they were matched one after the other.
+    assert device._match(b"VOLT?") == b"1"
+
+
+def test_device_queues_prebuilt_static_responses():
+    device = Device("dev", b";")
+    device.add_dialogue("*IDN?", "DEV")
+    device.add_error_handler("ERROR")
+    device.add_eom("GPIB INSTR", "\\n", "\\r\\n")
+    device.resource_name = "GPIB0::1::INSTR"
+
+    device.write(b"*IDN?\n")
+    framed = device._framed
+    assert framed is not None and framed[b"*IDN?"] == b"DEV\r\n"
+    assert device.read(100) == (b"DEV\r\n", True)
+
+    device.write(b"*IDN?\n")
+    assert device._output_buffer._responses[0] is framed[b"*IDN?"]
+    device._output_buffer.clear()
+
+    device.write(b"BOGUS\n")
+    assert device.read(100) == (b"ERROR\r\n", True)
+
+
+def test_device_processes_pipelined_messages():
+    device = Device("dev", b";")
+    device.add_dialogue("*IDN?", "DEV")
+    device.add_property("volt", "1.0", ("VOLT?", "{:.1f}"), None, {"type": "float"})
+    device.add_eom("GPIB INSTR", "\\r\\n", "\\n")
+    device.resource_name = "GPIB0::1::INSTR"
+
+    device.write(b"*IDN?\r\nVOLT?\r\n")
+    assert device.read(100) == (b"DEV\n", True)
+    assert device.read(100) == (b"1.0\n", True)
+    assert not device._input_buffer
+
+    # Messages, and their end of message, can be split across writes.
+    device.write(b"*ID")
+    device.write(b"N?\r")
+    assert not device._output_buffer
+    device.write(b"\n*ID")
+    assert device.read(100) == (b"DEV\n", True)
+    assert device._input_buffer == b"*ID"
+
+
+def test_lazy_device_collapses_known_sets():
+    device = Device("dev", b";")
+    device.add_property(
+        "volt",
+        "1.0",
+        ("VOLT?", "{:.1f}"),
+        ("VOLT {:f}", NoResponse, "ERROR"),
+        {"type": "float", "min": "0", "max": "10"},
+    )
+    device.add_eom("GPIB INSTR", "\\n", "\\n")
+    device.resource_name = "GPIB0::1::INSTR"
+    device.lazy = True
+
+    device.write(b"VOLT 2.0\nVOLT 3.0\nVOLT 20.0\n")
+    assert len(device._pending) == 3
+    assert device._properties["volt"].get_value() == 1.0
+    assert device.read(100) == (b"ERROR\n", True)
+    assert device._properties["volt"].get_value() == 3.0
+
+    device.write(b"VOLT 2.0\nVOLT 3.0\nVOLT 2.0\nVOLT?\n")
+    assert device._pending[:3] == [None, None, (b"VOLT 2.0", ("volt", 2.0))]
+    assert device.read(100) == (b"2.0\n", True)
+
+    # Any other query prevents collapsing the sets surrounding it.
+    device.write(b"VOLT 3.0\nVOLT?\nVOLT 2.0\n")
+    assert None not in device._pending
+    device.flush()
+    assert device.read(100) == (b"3.0\n", True)
+    assert device._properties["volt"].get_value() == 2.0
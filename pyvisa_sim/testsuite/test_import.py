@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+
+import pyvisa_sim
+
+#: Modules only needed once definitions are loaded.
+HEAVY_MODULES = {"yaml", "stringparser", "pyvisa_sim.parser", "pyvisa_sim.component"}
+
+
+def _import_times(statement):
+    """Cumulative import time (us) of the modules imported by a statement."""
+    root = os.path.dirname(os.path.dirname(pyvisa_sim.__file__))
+    env = dict(os.environ, PYTHONPATH=root)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_is_fast() -> None:
+    times = _import_times("import pyvisa_sim")
+    assert not ({"pyvisa", "pyvisa_sim.highlevel"} | HEAVY_MODULES) & set(times)
+    assert times["pyvisa_sim"] < 100_000
+
+
+def test_backend_import_defers_definitions_loading() -> None:
+    times = _import_times("import pyvisa_sim; pyvisa_sim.WRAPPER_CLASS")
+    assert "pyvisa_sim.highlevel" in times
+    assert not (HEAVY_MODULES | {"pyvisa_sim.sessions.gpib"}) & set(times)
@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
+import os
 from typing import Dict, Tuple
 
 import pytest
+import yaml
 
-from pyvisa_sim import parser
+from pyvisa_sim import cache, formats, parser
 from pyvisa_sim.component import NoResponse, OptionalStr
 
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
 
 @pytest.mark.parametrize(
     "dialogue_dict, want",
@@ -55,3 +59,492 @@ def test_get_triplet(
 def test_get_triplet_requires_query_key() -> None:
     with pytest.raises(KeyError):
         parser._get_triplet({"r": "bar"})
+
+
+SEEDED_DEFINITION = """
+spec: "1.1"
+random_seed: 7
+devices:
+  dmm:
+    dialogues:
+      - q: ":READ?"
+        r: "{RANDOM(0, 10, 3):.4f}"
+  other dmm:
+    random_seed: 8
+    dialogues:
+      - q: ":READ?"
+        r: "{RANDOM(0, 10, 3):.4f}"
+resources:
+  GPIB0::1::INSTR:
+    device: dmm
+  GPIB0::2::INSTR:
+    device: dmm
+  GPIB0::3::INSTR:
+    device: other dmm
+"""
+
+
+def test_random_seed(tmp_path) -> None:
+    path = tmp_path / "seeded.yaml"
+    path.write_text(SEEDED_DEFINITION)
+    devices = parser.get_devices(path, False)
+
+    def read(resource_name):
+        return devices[resource_name]._match(b":READ?")
+
+    first = read("GPIB0::1::INSTR")
+    assert read("GPIB0::2::INSTR") == first
+    assert read("GPIB0::1::INSTR") != first
+    assert read("GPIB0::3::INSTR") != first
+
+
+def _describe(device):
+    """Summarize the definitions held by a device."""
+    device.compile()
+    return (
+        {
+            query: getattr(handler, "response", handler.__class__.__name__)
+            for query, handler in device._dispatch.items()
+        },
+        [query for query, _ in device._setters.items()],
+        {name: prop.get_value() for name, prop in device._properties.items()},
+        device._eoms,
+        device._error_response,
+        sorted(device._channels),
+    )
+
+
+@pytest.mark.skipif(
+    not hasattr(yaml, "CBaseLoader"), reason="PyYAML was built without libyaml"
+)
+@pytest.mark.parametrize(
+    "filename", ["default.yaml", os.path.join(FIXTURES, "channels.yaml")]
+)
+def test_libyaml_loader_matches_python_loader(filename, monkeypatch) -> None:
+    # Definitions must be parsed by each loader rather than found in the cache.
+    monkeypatch.setenv("PYVISA_SIM_CACHE_DIR", "")
+    bundled = filename == "default.yaml"
+    results = []
+    for loader in (yaml.CBaseLoader, yaml.loader.BaseLoader):
+        monkeypatch.setattr(parser, "YAML_LOADER", loader)
+        cache.clear_registry()
+        data = (
+            parser.parse_resource(filename) if bundled else parser.parse_file(filename)
+        )
+        devices = parser.get_devices(filename, bundled)
+        results.append(
+            (
+                data,
+                {name: _describe(devices[name]) for name in devices.list_resources()},
+            )
+        )
+
+    assert results[0] == results[1]
+
+
+def test_devices_are_built_on_first_access(monkeypatch) -> None:
+    monkeypatch.setenv("PYVISA_SIM_CACHE_DIR", "")
+    cache.clear_registry()
+    built = []
+    get_device = parser.get_device
+
+    def counting_get_device(name, *args):
+        built.append(name)
+        return get_device(name, *args)
+
+    monkeypatch.setattr(parser, "get_device", counting_get_device)
+    devices = parser.get_devices("default.yaml", True)
+    resources = devices.list_resources()
+    assert "GPIB0::8::INSTR" in resources
+    assert not built
+
+    device = devices["GPIB0::8::INSTR"]
+    assert device.resource_name == "GPIB0::8::INSTR"
+    assert devices["GPIB0::8::INSTR"] is device
+    assert built == ["device 1"]
+    assert devices.list_resources() == resources
+
+
+def test_malformed_device_is_reported_on_access(tmp_path) -> None:
+    path = tmp_path / "malformed.yaml"
+    path.write_text(
+        'spec: "1.1"\n'
+        "devices:\n"
+        "  dev:\n"
+        "    dialogues:\n"
+        '      - r: "no query"\n'
+        "resources:\n"
+        "  GPIB0::1::INSTR:\n"
+        "    device: dev\n"
+    )
+    devices = parser.get_devices(path, False)
+    assert devices.list_resources() == ("GPIB0::1::INSTR",)
+    with pytest.raises(Exception, match="malformed dialogue"):
+        devices["GPIB0::1::INSTR"]
+
+
+BASES_DEFINITION = """
+spec: "1.1"
+devices:
+  base:
+    eom:
+      GPIB INSTR:
+        q: "\\n"
+        r: "\\n"
+    error: ERROR
+    dialogues:
+      - q: "*IDN?"
+        r: "BASE"
+      - q: "*OPC?"
+        r: "1"
+    properties:
+      volt:
+        default: 1.0
+        getter:
+          q: "VOLT?"
+          r: "{:.1f}"
+        setter:
+          q: "VOLT {:f}"
+        specs:
+          type: float
+  variant:
+    bases: [base]
+  derived:
+    bases: [base]
+    dialogues:
+      - q: "*IDN?"
+        r: "DERIVED"
+    properties:
+      volt:
+        default: 2.0
+        getter:
+          q: "VOLT?"
+          r: "{:.2f}"
+        setter:
+          q: "SOUR:VOLT {:f}"
+        specs:
+          type: float
+  circular:
+    bases: [circular]
+  looped:
+    bases: [base, loop]
+  loop:
+    bases: [loop_back]
+  loop_back:
+    bases: [loop]
+  diamond:
+    bases: [variant, derived]
+resources:
+  GPIB0::1::INSTR:
+    device: variant
+  GPIB0::2::INSTR:
+    device: variant
+  GPIB0::3::INSTR:
+    device: derived
+  GPIB0::4::INSTR:
+    device: circular
+  GPIB0::5::INSTR:
+    device: looped
+  GPIB0::6::INSTR:
+    device: diamond
+"""
+
+
+def test_bases(tmp_path) -> None:
+    path = tmp_path / "bases.yaml"
+    path.write_text(BASES_DEFINITION)
+    devices = parser.get_devices(path, False)
+
+    first, second = devices["GPIB0::1::INSTR"], devices["GPIB0::2::INSTR"]
+    assert first.name == "variant"
+    assert first._match(b"*IDN?") == b"BASE"
+    assert first._match(b"VOLT 3.0") is NoResponse
+    assert first._match(b"VOLT?") == b"3.0"
+    assert second._match(b"VOLT?") == b"1.0"
+    assert first._match(b"BOGUS") is None
+    assert first.error_response("command_error") == b"ERROR"
+
+    # Devices which do not alter their bases share their command tables.
+    assert first._dispatch is second._dispatch
+    assert first._setters is second._setters
+
+    derived = devices["GPIB0::3::INSTR"]
+    assert derived._match(b"*IDN?") == b"DERIVED"
+    assert derived._match(b"*OPC?") == b"1"
+    assert derived._match(b"VOLT?") == b"2.00"
+    assert derived._match(b"VOLT 3.0") is None
+    assert derived._match(b"SOUR:VOLT 3.0") is NoResponse
+    assert derived._match(b"VOLT?") == b"3.00"
+    assert first._match(b"*IDN?") == b"BASE"
+    assert first._match(b"SOUR:VOLT 3.0") is None
+
+    with pytest.raises(ValueError, match="Circular"):
+        devices["GPIB0::4::INSTR"]
+    with pytest.raises(ValueError, match="Circular bases involving device loop"):
+        devices["GPIB0::5::INSTR"]
+
+    # A base reached through several bases is not a cycle.
+    diamond = devices["GPIB0::6::INSTR"]
+    assert diamond._match(b"*IDN?") == b"DERIVED"
+    assert diamond._match(b"VOLT?") == b"2.00"
+
+
+TEMPLATE_DEFINITION = """
+spec: "1.1"
+devices:
+  smu:
+    dialogues:
+      - q: "*IDN?"
+        r: "SMU"
+    properties:
+      volt:
+        default: 1.0
+        getter:
+          q: "VOLT?"
+          r: "{:.1f}"
+        setter:
+          q: "VOLT {:f}"
+        specs:
+          type: float
+resources:
+  GPIB0::{1..3}::INSTR:
+    device: smu
+  TCPIP0::{rack1,rack2}::inst0::INSTR:
+    device: smu
+"""
+
+
+def test_channel_bases_are_rejected(tmp_path) -> None:
+    path = tmp_path / "bases.yaml"
+    path.write_text(
+        BASES_DEFINITION.replace(
+            "  variant:\n    bases: [base]\n",
+            "  variant:\n    bases: [base]\n    channels:\n"
+            "      ch2:\n        ids: [1]\n        bases: [base]\n",
+        )
+    )
+    with pytest.raises(ValueError, match="In device variant, In channels ch2"):
+        parser.get_definitions(path, False)
+
+
+@pytest.mark.parametrize(
+    "name, expanded",
+    [
+        ("GPIB0::1::INSTR", ["GPIB0::1::INSTR"]),
+        (
+            "GPIB0::{1..3}::INSTR",
+            ["GPIB0::1::INSTR", "GPIB0::2::INSTR", "GPIB0::3::INSTR"],
+        ),
+        ("ASRL{1,3}::INSTR", ["ASRL1::INSTR", "ASRL3::INSTR"]),
+        (
+            "GPIB{0..1}::{1,2}::INSTR",
+            [
+                "GPIB0::1::INSTR",
+                "GPIB0::2::INSTR",
+                "GPIB1::1::INSTR",
+                "GPIB1::2::INSTR",
+            ],
+        ),
+    ],
+)
+def test_expand_resource_name(name, expanded) -> None:
+    assert parser.expand_resource_name(name) == expanded
+
+
+def test_resource_templates(tmp_path) -> None:
+    path = tmp_path / "templates.yaml"
+    path.write_text(TEMPLATE_DEFINITION)
+    devices = parser.get_devices(path, False)
+    assert devices.list_resources() == (
+        "GPIB0::1::INSTR",
+        "GPIB0::2::INSTR",
+        "GPIB0::3::INSTR",
+        "TCPIP0::rack1::inst0::INSTR",
+        "TCPIP0::rack2::inst0::INSTR",
+    )
+
+    first, second = devices["GPIB0::1::INSTR"], devices["GPIB0::3::INSTR"]
+    assert first.resource_name == "GPIB0::1::INSTR"
+    assert first._dispatch is second._dispatch
+    assert first._setters is second._setters
+    assert first._match(b"VOLT 2.0") is NoResponse
+    assert first._match(b"VOLT?") == b"2.0"
+    assert second._match(b"VOLT?") == b"1.0"
+    assert devices["TCPIP0::rack2::inst0::INSTR"]._dispatch is not first._dispatch
+
+
+def test_invalid_resource_template() -> None:
+    with pytest.raises(ValueError, match="Invalid range"):
+        parser.expand_resource_name("GPIB0::{1..a}::INSTR")
+
+
+VENDOR_DEFINITION = """
+spec: "1.1"
+devices:
+  dev:
+    bases:
+      - device: base
+        filename: base.yaml
+    dialogues:
+      - q: "*IDN?"
+        r: "VENDOR %d"
+"""
+
+BASE_DEFINITION = """
+spec: "1.1"
+devices:
+  base:
+    dialogues:
+      - q: "*OPC?"
+        r: "1"
+"""
+
+
+def _write_lab(tmp_path, count):
+    """Write a lab definition referencing count vendor files."""
+    lines = ['spec: "1.1"', "resources:"]
+    for i in range(count):
+        (tmp_path / ("vendor%d.yaml" % i)).write_text(VENDOR_DEFINITION % i)
+        lines += ["  GPIB0::%d::INSTR:" % (i + 1), "    device: dev"]
+        lines += ["    filename: vendor%d.yaml" % i]
+    (tmp_path / "base.yaml").write_text(BASE_DEFINITION)
+    path = tmp_path / "lab.yaml"
+    path.write_text("\n".join(lines))
+    return path
+
+
+@pytest.mark.parametrize("processes", [False, True])
+@pytest.mark.parametrize("loader", ["CBaseLoader", "BaseLoader"])
+def test_referenced_files_are_preloaded(
+    tmp_path, monkeypatch, loader, processes
+) -> None:
+    monkeypatch.setattr(parser, "YAML_LOADER", getattr(yaml, loader))
+    monkeypatch.setattr(parser, "PARALLEL_PARSING_PROCESSES", processes)
+    pools = []
+    executor = parser.ProcessPoolExecutor
+
+    def recording_executor(workers):
+        pools.append(workers)
+        return executor(workers)
+
+    monkeypatch.setattr(parser, "ProcessPoolExecutor", recording_executor)
+    path = _write_lab(tmp_path, 6)
+
+    preloaded = parser.Loader(path, False)
+    preloaded.preload()
+    assert len(preloaded._parsed) == 7
+    # Processes are only started when explicitly enabled.
+    assert bool(pools) == (processes and loader == "BaseLoader")
+
+    devices = parser.get_devices(path, False)
+    for i in range(6):
+        device = devices["GPIB0::%d::INSTR" % (i + 1)]
+        assert device._match(b"*IDN?") == b"VENDOR %d" % i
+        assert device._match(b"*OPC?") == b"1"
+
+
+def test_preloading_errors_are_deterministic(tmp_path, monkeypatch) -> None:
+    path = _write_lab(tmp_path, 6)
+    (tmp_path / "vendor2.yaml").write_text("devices: [")
+    (tmp_path / "vendor4.yaml").write_text('spec: "1.1"\ndevices: {')
+
+    errors = []
+    for threshold in (1, 100):
+        monkeypatch.setattr(parser, "PARALLEL_PARSING_MIN_FILES", threshold)
+        with pytest.raises(Exception) as e:
+            parser.get_devices(path, False)
+        errors.append(str(e.value))
+
+    assert errors[0] == errors[1]
+    assert "vendor2.yaml" in errors[0]
+
+
+def test_files_are_loaded_once_whatever_their_spelling(tmp_path) -> None:
+    (tmp_path / "vendor.yaml").write_text(VENDOR_DEFINITION % 0)
+    (tmp_path / "base.yaml").write_text(BASE_DEFINITION)
+    (tmp_path / "sub").mkdir()
+    spellings = ["vendor.yaml", "./vendor.yaml", "sub/../vendor.yaml"]
+    spellings.append(str(tmp_path / "vendor.yaml"))
+    lines = ['spec: "1.1"', "resources:"]
+    for i, spelling in enumerate(spellings):
+        lines += ["  GPIB0::%d::INSTR:" % (i + 1), "    device: dev"]
+        lines += ["    filename: %s" % spelling]
+    path = tmp_path / "lab.yaml"
+    path.write_text("\n".join(lines))
+
+    loader = parser.Loader(path, False)
+    for spelling in spellings:
+        loader.get_device_dict("dev", spelling, False, 1)
+    loader.load("base.yaml", False, None, 1)
+    assert len(loader._cache) == 3
+    assert (loader.misses, loader.hits) == (3, 3)
+
+
+JSON_DEFINITION = """
+{
+  "spec": "1.1",
+  "devices": {
+    "dev": {
+      "lazy": true,
+      "random_seed": 3,
+      "dialogues": [{"q": "*IDN?", "r": "DEV"}],
+      "properties": {
+        "volt": {
+          "default": 1.5,
+          "getter": {"q": "VOLT?", "r": "{:.1f}"},
+          "setter": {"q": "VOLT {:.1f}"},
+          "specs": {"type": "float", "min": 0, "max": 1e1}
+        }
+      },
+      "channels": {
+        "output": {
+          "ids": [1, 2],
+          "can_select": false,
+          "dialogues": [{"q": "OUT?", "r": "OUT"}]
+        }
+      }
+    }
+  },
+  "resources": {"GPIB0::1::INSTR": {"device": "dev"}}
+}
+"""
+
+
+def test_json_definitions(tmp_path) -> None:
+    path = tmp_path / "lab.json"
+    path.write_text(JSON_DEFINITION)
+    data = parser.parse_file(path)
+    dev = data["devices"]["dev"]
+    assert dev["lazy"] == "true"
+    assert dev["random_seed"] == "3"
+    assert dev["properties"]["volt"]["default"] == "1.5"
+    assert dev["properties"]["volt"]["specs"]["max"] == "1e1"
+    assert dev["channels"]["output"]["ids"] == ["1", "2"]
+
+    device = parser.get_devices(path, False)["GPIB0::1::INSTR"]
+    assert device.lazy
+    assert not device._channels["output"].can_select
+    assert device._match(b"VOLT?") == b"1.5"
+    assert device._match(b"*IDN?") == b"DEV"
+
+
+def test_toml_scalars() -> None:
+    data = formats.loads(
+        "flag = false\nfloat = 1e3\nhex = 0x10\nint = 1_000\n"
+        "date = 1979-05-27T07:32:00\n",
+        "toml",
+    )
+    assert data == {
+        "flag": "false",
+        "float": "1e3",
+        "hex": "16",
+        "int": "1000",
+        "date": "1979-05-27T07:32:00",
+    }
+
+
+def test_malformed_json_definitions(tmp_path) -> None:
+    path = tmp_path / "lab.json"
+    path.write_text('{"spec": "1.1",')
+    with pytest.raises(ValueError, match="Malformed json file"):
+        parser.parse_file(path)